@@ -0,0 +1,78 @@
+"""
+Vectorized beautify_result_df against the former row-wise DataFrame.apply implementation.
+
+    python -m benchmarks.bench_beautify --sizes 10000 100000 --output bench_beautify.json
+"""
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import dump, measure, parse_args, result
+from upstream_viz_lib.pages.pipe.pipeline_production import beautify_result_df
+
+
+def beautify_result_df_rowwise(df):
+    """Implementation replaced by pipeline_production.beautify_result_columns, kept as reference."""
+    def swap_start_end(row):
+        if not row["startIsSource"] and row["X_kg_sec"] < 0:
+            return row["node_name_end"], row["node_name_start"]
+        else:
+            return row["node_name_start"], row["node_name_end"]
+
+    def make_positive(row, colname):
+        return row[colname] if row["startIsSource"] else abs(row[colname])
+
+    def convert_flow_to_m3_day(row):
+        density = (
+            row["density_calc"] * 1000
+            if "density_calc" in row
+            else row["res_liquid_density_kg_m3"]
+        )
+        return row["X_kg_sec"] * 86400 / density
+
+    df[["node_name_start", "node_name_end"]] = df.apply(
+        swap_start_end, axis=1, result_type="expand"
+    )
+    df["X_kg_sec"] = df.apply(lambda row: make_positive(row, "X_kg_sec"), axis=1)
+    df["X_m3_day"] = df.apply(convert_flow_to_m3_day, axis=1)
+    df["velocity_m_sec"] = df.apply(lambda row: make_positive(row, "velocity_m_sec"), axis=1)
+    return df
+
+
+def synthetic_pipe_results(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Hydraulic calculation results with calculate_DF output columns used by beautify and hcalc_dashboard."""
+    rng = np.random.default_rng(seed)
+    node_id_start = np.char.add("node_", rng.integers(0, n_rows, n_rows).astype(str))
+    node_id_start[rng.random(n_rows) < 0.1] = "PAD_1"
+    return pd.DataFrame({
+        "node_id_start": node_id_start,
+        "node_id_end": np.char.add("node_", rng.integers(0, n_rows, n_rows).astype(str)),
+        "juncType": np.where(rng.random(n_rows) < 0.2, "oilwell", "pipe"),
+        "endIsOutlet": rng.random(n_rows) < 0.05,
+        "res_watercut_percent": rng.uniform(0.0, 100.0, n_rows),
+        "node_name_start": np.char.add("node_", rng.integers(0, n_rows, n_rows).astype(str)),
+        "node_name_end": np.char.add("node_", rng.integers(0, n_rows, n_rows).astype(str)),
+        "startIsSource": rng.random(n_rows) < 0.3,
+        "X_kg_sec": rng.normal(0.0, 5.0, n_rows),
+        "velocity_m_sec": rng.normal(0.0, 1.0, n_rows),
+        "density_calc": rng.uniform(0.8, 1.1, n_rows),
+        "res_liquid_density_kg_m3": rng.uniform(800.0, 1100.0, n_rows),
+    })
+
+
+def main():
+    args = parse_args(__doc__, default_sizes=[10_000, 100_000])
+    results = []
+    for n_rows in args.sizes:
+        df = synthetic_pipe_results(n_rows)
+        vectorized = beautify_result_df(df.copy())
+        rowwise = beautify_result_df_rowwise(df.copy())
+        pd.testing.assert_frame_equal(vectorized, rowwise, check_dtype=False)
+
+        results.append(result("beautify_vectorized", n_rows, measure(lambda: beautify_result_df(df.copy()), args.repeat)))
+        results.append(result("beautify_rowwise", n_rows, measure(lambda: beautify_result_df_rowwise(df.copy()), args.repeat)))
+        results[-1]["speedup"] = results[-1]["seconds_min"] / results[-2]["seconds_min"]
+    dump("beautify", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+FCF of optimizer results from NumPy columns (common.economics.fcf_columns) against DataFrame.apply.
+Both build one Economics object per well, the difference is the per-row pandas overhead.
+
+    python -m benchmarks.bench_fcf --sizes 1000 10000 50000 --output bench_fcf.json
+"""
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import dump, measure, parse_args, result
+from upstream_viz_lib.pages.opt.optimize import add_new_fcf, calculate_fcf, get_oil_debit
+
+ECONOMIC_PARAMS = {}  # Economics defaults
+
+
+def add_new_fcf_rowwise(df, _params):
+    """Implementation replaced by the columnar optimize.add_new_fcf, kept as reference."""
+    df["Qn_new"] = df.apply(lambda row: get_oil_debit(row), axis=1)
+    df["URE_new"] = (
+        24 * df["res_pump_power_watt"] / (1000 * df["X_m3_day"] * df["density_calc"])
+    )
+    df["URE_new"] = df["URE_new"].fillna(df["URE"])
+    df["FCF_new"] = df.apply(
+        lambda x: calculate_fcf(
+            x, _params, q_col="X_m3_day", qn_col="Qn_new", ure_col="URE_new"
+        ),
+        axis=1,
+    )
+    return df
+
+
+def synthetic_opt_results(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Beautified optimizer results of n_rows wells, as passed to add_new_fcf."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "shtr_debit": rng.uniform(5.0, 200.0, n_rows),
+        "shtr_oil_debit": rng.uniform(1.0, 50.0, n_rows),
+        "VolumeWater": rng.uniform(0.0, 99.0, n_rows),
+        "X_m3_day": rng.uniform(5.0, 200.0, n_rows),
+        "res_pump_power_watt": np.where(rng.random(n_rows) < 0.1, np.nan, rng.uniform(1e3, 1e5, n_rows)),
+        "density_calc": rng.uniform(0.8, 1.1, n_rows),
+        "URE": rng.uniform(1.0, 20.0, n_rows),
+    })
+
+
+def main():
+    args = parse_args(__doc__, default_sizes=[1_000, 10_000, 50_000])
+    results = []
+    for n_rows in args.sizes:
+        df = synthetic_opt_results(n_rows)
+        expected = add_new_fcf_rowwise(df.copy(), ECONOMIC_PARAMS)
+        pd.testing.assert_frame_equal(add_new_fcf(df.copy(), ECONOMIC_PARAMS), expected, rtol=1e-9)
+
+        timing = measure(lambda: add_new_fcf(df.copy(), ECONOMIC_PARAMS), args.repeat)
+        results.append(result("add_new_fcf_columns", n_rows, timing))
+        timing = measure(lambda: add_new_fcf_rowwise(df.copy(), ECONOMIC_PARAMS), args.repeat)
+        results.append(result("add_new_fcf_rowwise", n_rows, timing))
+        results[-1]["speedup"] = results[-1]["seconds_min"] / results[-2]["seconds_min"]
+    dump("fcf", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Latency and peak memory of hcalc_dashboard.output_results on synthetic hydraulic calculation results.
+
+    python -m benchmarks.bench_hcalc_dashboard --sizes 10000 100000 --output bench_hcalc_dashboard.json
+"""
+import pandas as pd
+
+from benchmarks.bench_beautify import synthetic_pipe_results
+from benchmarks.common import dump, measure, parse_args, peak_memory_mb, result
+from upstream_viz_lib.pages.pipe.hcalc_dashboard import output_results
+
+OPTIONS = {"selected_dns": "НС ДНС-1", "only_working": True}
+
+
+def dns_load_stub(q, selected_dns, only_working=True) -> pd.DataFrame:
+    return pd.DataFrame([
+        {"device_type": "ДНС", "oil_density_counted": 0.85, "predict_load_rate": q / 10_000},
+        {"device_type": "Насос", "oil_density_counted": None, "predict_load_rate": q / 5_000},
+    ])
+
+
+def main():
+    args = parse_args(__doc__, default_sizes=[10_000, 100_000])
+    results = []
+    for n_rows in args.sizes:
+        df = synthetic_pipe_results(n_rows)
+        run = lambda: output_results(df, OPTIONS, getDnsLoadFn=dns_load_stub)
+        results.append(result("output_results", n_rows, measure(run, args.repeat), peak_mb=peak_memory_mb(run)))
+    dump("hcalc_dashboard", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
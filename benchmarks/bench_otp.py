@@ -0,0 +1,85 @@
+"""
+Latency and throughput of the otp data paths against the in-process LocalPlatform.
+
+    python -m benchmarks.bench_otp --sizes 10000 100000 1000000 --output bench_otp.json
+"""
+import pandas as pd
+
+from benchmarks.common import dump, measure, parse_args, result
+from upstream_viz_lib.common import otp
+from upstream_viz_lib.common.comments import Comments
+from upstream_viz_lib.common.local_platform import LocalPlatform, synthetic_well_metrics
+from upstream_viz_lib.common.query_template import QueryTemplate
+
+QUERY_WELL_METRICS = """
+| readFile format=parquet path=well/metrics
+| where __deposit="__DEPOSIT__" AND __well_num="__WELL__"
+"""
+QUERY_ALL_METRICS = "| readFile format=parquet path=well/metrics_all"
+COMMENTS_SOURCE = "readFile format=parquet path=well/comments"
+
+
+def bench_rendering(n_rows: int, repeat: int) -> dict:
+    template = QueryTemplate(QUERY_WELL_METRICS)
+    params = [{"DEPOSIT": "Месторождение", "WELL": str(i)} for i in range(n_rows)]
+    return result("render_many", n_rows, measure(lambda: template.render_many(params), repeat))
+
+
+def bench_read_paths(platform: LocalPlatform, n_rows: int, repeat: int) -> list:
+    results = []
+    rows = otp.load_rows(QUERY_ALL_METRICS, ttl=0)
+    df = pd.DataFrame(rows)
+
+    results.append(result("load_rows", n_rows, measure(lambda: otp.load_rows(QUERY_ALL_METRICS, ttl=0), repeat)))
+    results.append(result("frame_build", n_rows, measure(lambda: pd.DataFrame(rows), repeat)))
+    results.append(result("dt_conversion", n_rows, measure(lambda: otp.add_dt(df.copy()), repeat)))
+    results.append(result(
+        "get_data_no_cache", n_rows, measure(lambda: otp.get_data_no_cache(QUERY_ALL_METRICS), repeat)
+    ))
+
+    def consume_iter():
+        return sum(chunk["value"].sum() for chunk in otp.get_data_iter(QUERY_ALL_METRICS, chunk_size=50_000))
+
+    results.append(result("get_data_iter", n_rows, measure(consume_iter, repeat)))
+
+    otp.get_query_cache().clear()
+    otp.get_data(QUERY_ALL_METRICS)
+    results.append(result("get_data_cache_hit", n_rows, measure(lambda: otp.get_data(QUERY_ALL_METRICS), repeat)))
+    otp.get_query_cache().clear()
+    return results
+
+
+def bench_write_paths(platform: LocalPlatform, df: pd.DataFrame, repeat: int) -> list:
+    n_rows = len(df)
+    timing = measure(lambda: otp.load_df(df, path="well/metrics_copy", write_format="parquet"), repeat)
+    written = len(platform.storage["well/metrics_copy"])
+    results = [result("load_df", n_rows, timing, written_rows=written)]
+
+    platform.add_dataset("filldown_group", [
+        {"__deposit": "Месторождение", "__well_num": "0", "comment": "-", "comment_plan_event": "-",
+         "comment_completed_event": "-"}
+    ])
+    comments = Comments(COMMENTS_SOURCE, keys=["__deposit", "__well_num"])
+    new_comments = df[["__deposit", "__well_num"]].drop_duplicates().assign(comment="Проверить ЭЦН")
+    n_comments = len(new_comments)
+    timing = measure(lambda: comments.save_comments(new_comments.copy(), source="bench", user="bench"), repeat)
+    results.append(result("save_comments", n_comments, timing))
+    return results
+
+
+def main():
+    args = parse_args(__doc__, default_sizes=[10_000, 100_000, 1_000_000])
+    results = []
+    for n_rows in args.sizes:
+        df = synthetic_well_metrics(n_rows, n_wells=max(n_rows // 100, 1))
+        platform = LocalPlatform()
+        platform.add_dataset("path=well/metrics_all", df)
+        with platform.installed():
+            results.append(bench_rendering(n_rows, args.repeat))
+            results += bench_read_paths(platform, n_rows, args.repeat)
+            results += bench_write_paths(platform, df, args.repeat)
+    dump("otp", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Columnar clean/fill of pipeline_production against the former per-outlet and row-wise implementation.
+
+    python -m benchmarks.bench_pipeline_preprocess --sizes 5000 20000 100000 --output bench_pipeline_preprocess.json
+"""
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import dump, measure, parse_args, result
+from upstream_viz_lib.pages.pipe.pipeline_production import clean, fill
+
+
+def clean_rowwise(df):
+    """Implementation replaced by the columnar pipeline_production.clean, kept as reference."""
+    only_pipes_mask = df["juncType"] != "oilwell"
+    wells_with_pump_mask = (df["juncType"] == "oilwell") & (df["model"].notna()) & (df["model"] != "Воронка")
+    df = df[only_pipes_mask | wells_with_pump_mask].copy()
+    df.dropna(subset=["node_id_start", "node_id_end"], how="any", inplace=True)
+    return df.drop_duplicates()
+
+
+def fill_rowwise(df, options):
+    """Implementation replaced by the columnar pipeline_production.fill, kept as reference."""
+    df = df.copy()
+    for key, (value, _) in options["liquid_properties"].items():
+        df[key] = float(value)
+    for key, value in options["outlets_dict"].items():
+        df.loc[df["node_name_end"] == key, "endValue"] = float(value)
+    df["rs_schema_name"] = options["selected_dns"]
+    df["effectiveD"] = options["eff_diam"]
+    df["productivity"] = df["productivity"].apply(lambda x: abs(x) if x != 0 else 0.01).fillna(0.01)
+    df["VolumeWater"] = df["VolumeWater"].astype(float)
+    df["endIsOutlet"] = df["endIsOutlet"].fillna(False)
+    df[["node_id_start", "node_id_end"]] = df[["node_id_start", "node_id_end"]].astype(str)
+    return df.rename(columns={"__pad_num": "padNum", "__well_num": "wellNum", "d": "D", "s": "S"})
+
+
+def synthetic_pipeline_input(n_rows: int, n_outlets: int, seed: int = 0):
+    """Pipeline input data as loaded for hydraulic calculation and sidebar options with n_outlets outlet pressures."""
+    rng = np.random.default_rng(seed)
+    node_names = np.char.add("Узел ", rng.integers(0, n_rows, n_rows).astype(str))
+    outlets = rng.choice(node_names, n_outlets, replace=False)
+    node_names[rng.integers(0, n_rows, n_outlets * 5)] = np.repeat(outlets, 5)
+    is_well = rng.random(n_rows) < 0.4
+    node_id_start = rng.integers(0, n_rows, n_rows).astype(float)
+    node_id_start[rng.random(n_rows) < 0.01] = np.nan
+    df = pd.DataFrame({
+        "juncType": np.where(is_well, "oilwell", "pipe"),
+        "model": np.where(is_well, rng.choice(["ЭЦН-50", "ЭЦН-80", "Воронка", None], n_rows), None),
+        "node_id_start": node_id_start,
+        "node_id_end": rng.integers(0, n_rows, n_rows),
+        "node_name_end": node_names,
+        "endIsOutlet": np.where(np.isin(node_names, outlets), True, None),
+        "endValue": np.where(rng.random(n_rows) < 0.1, rng.uniform(1.0, 10.0, n_rows), np.nan),
+        "productivity": np.where(rng.random(n_rows) < 0.2, 0.0, rng.normal(0.0, 2.0, n_rows)),
+        "VolumeWater": rng.integers(0, 100, n_rows),
+        "__pad_num": rng.integers(1, 200, n_rows),
+        "__well_num": rng.integers(1, 5000, n_rows).astype(str),
+        "d": rng.uniform(0.1, 0.5, n_rows),
+        "s": rng.uniform(0.005, 0.01, n_rows),
+    })
+    options = {
+        "liquid_properties": {"oil_density_kg_m3": ("826", "Плотность нефти"), "gas_factor": ("60", "Газовый фактор")},
+        "outlets_dict": {name: float(i % 10 + 1) for i, name in enumerate(outlets)},
+        "selected_dns": "ДНС-1",
+        "eff_diam": 0.85,
+    }
+    return df, options
+
+
+def main():
+    args = parse_args(__doc__, default_sizes=[5_000, 20_000, 100_000])
+    results = []
+    for n_rows in args.sizes:
+        df, options = synthetic_pipeline_input(n_rows, n_outlets=max(n_rows // 500, 1))
+        columnar = fill(clean(df), options)
+        rowwise = fill_rowwise(clean_rowwise(df), options)
+        pd.testing.assert_frame_equal(columnar, rowwise)
+
+        timing = measure(lambda: fill(clean(df), options), args.repeat)
+        results.append(result("clean_fill_columnar", n_rows, timing, outlets=len(options["outlets_dict"])))
+        timing = measure(lambda: fill_rowwise(clean_rowwise(df), options), args.repeat)
+        results.append(result("clean_fill_rowwise", n_rows, timing, outlets=len(options["outlets_dict"])))
+        results[-1]["speedup"] = results[-1]["seconds_min"] / results[-2]["seconds_min"]
+    dump("pipeline_preprocess", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
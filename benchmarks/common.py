@@ -0,0 +1,64 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def measure(func: Callable[[], object], repeat: int = 3) -> dict:
+    """Run func `repeat` times, return min and median wall time in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {"seconds_min": min(times), "seconds_median": statistics.median(times), "repeat": repeat}
+
+
+def peak_memory_mb(func: Callable[[], object]) -> float:
+    """Peak memory allocated by python and numpy while running func, in MB."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def result(benchmark: str, rows: int, timing: dict, **extra) -> dict:
+    rows_per_sec = rows / timing["seconds_min"] if timing["seconds_min"] else None
+    return {"benchmark": benchmark, "rows": rows, **timing, "rows_per_sec": rows_per_sec, **extra}
+
+
+def parse_args(description: str, default_sizes: List[int]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--sizes", type=int, nargs="+", default=default_sizes, help="Numbers of rows")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write json results to file instead of stdout")
+    return parser.parse_args()
+
+
+def dump(suite: str, results: List[dict], output: Optional[str] = None):
+    """Write machine-readable results with environment info."""
+    report = {
+        "suite": suite,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
@@ -0,0 +1,27 @@
+import unittest
+
+import pandas as pd
+
+from upstream_viz_lib.common import bulk_writer
+
+
+class TestBulkWriter(unittest.TestCase):
+    def test_chunks_bounded_in_bytes(self):
+        df = pd.DataFrame({"name": ["Скважина №%d" % i for i in range(1000)], "q": range(1000)})
+        queries = []
+        _, report = bulk_writer.write_df(df, "test", queries.append, chunk_bytes=2048)
+        self.assertGreater(report.chunks, 1)
+        for chunk in bulk_writer.split_encoded_rows(bulk_writer.encode_rows(df), 2048):
+            payload = bulk_writer.ROWS_DELIMITER.join(chunk).encode("utf-8")
+            self.assertLessEqual(len(payload), 2048 + max(len(row.encode("utf-8")) for row in chunk))
+        self.assertEqual(report.chunks, len(queries))
+
+    def test_frame_without_columns(self):
+        queries = []
+        results, report = bulk_writer.write_df(pd.DataFrame(index=range(3)), "test", queries.append)
+        self.assertEqual((results, queries, report.chunks), ([], [], 0))
+        self.assertEqual(bulk_writer.encode_rows(pd.DataFrame(index=range(3))).tolist(), ["", "", ""])
+
+
+if __name__ == "__main__":
+    unittest.main()
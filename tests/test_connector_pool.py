@@ -0,0 +1,49 @@
+import unittest
+
+from upstream_viz_lib.common import connector_pool, otp, query_metrics
+from upstream_viz_lib.common.connector_pool import ConnectorPool, query_health_check
+from upstream_viz_lib.common.local_platform import LocalPlatform
+
+
+class BrokenJobs:
+    def create(self, *args, **kwargs):
+        raise OSError("session expired")
+
+
+class TestConnectorPool(unittest.TestCase):
+    def test_health_check_on_idle_connector(self):
+        platform = LocalPlatform()
+        pool = ConnectorPool(lambda: platform, size=1, health_check=query_health_check(), health_check_after=0)
+        reused = []
+        pool.run(lambda conn: None, on_acquire=reused.append)
+        pool.run(lambda conn: None, on_acquire=reused.append)
+        self.assertEqual(reused, [False, True])
+        self.assertEqual(platform.queries, [connector_pool.HEALTH_CHECK_QUERY])
+
+        platform.jobs = BrokenJobs()
+        pool.run(lambda conn: None, on_acquire=reused.append)
+        self.assertEqual(reused[-1], False)
+        self.assertEqual(pool.stats()["unhealthy"], 1)
+
+    def test_recently_used_connector_is_not_checked(self):
+        platform = LocalPlatform()
+        pool = ConnectorPool(lambda: platform, size=1, health_check=query_health_check(), health_check_after=60)
+        pool.run(lambda conn: None)
+        pool.run(lambda conn: None)
+        self.assertEqual(platform.queries, [])
+        self.assertEqual(pool.stats()["reused"], 1)
+
+    def test_query_record_reused_connector(self):
+        platform = LocalPlatform()
+        platform.add_dataset("metrics", [{"a": 1}])
+        with platform.installed(pool_size=1):
+            query_metrics.registry.clear()
+            otp.get_data_no_cache("metrics")
+            otp.get_data_no_cache("metrics")
+            records = query_metrics.registry.records()
+        self.assertEqual([r.reused_connector for r in records], [False, True])
+        self.assertEqual(query_metrics.registry.summary()[0]["reused_connectors"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from upstream_viz_lib.common.economics import fcf_columns, fcf_scalar
+from upstream_viz_lib.pages.opt import optimize
+from upstream_viz_lib.pages.well.potentials import model_potentials
+
+ECONOMIC_PARAMS = {}  # Economics defaults
+
+
+def opt_results_fixture(n_rows=200, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "shtr_debit": rng.uniform(5.0, 200.0, n_rows),
+        "shtr_oil_debit": rng.uniform(1.0, 50.0, n_rows),
+        "VolumeWater": rng.uniform(0.0, 99.0, n_rows),
+        "X_m3_day": rng.uniform(5.0, 200.0, n_rows),
+        "res_pump_power_watt": np.where(rng.random(n_rows) < 0.1, np.nan, rng.uniform(1e3, 1e5, n_rows)),
+        "density_calc": rng.uniform(0.8, 1.1, n_rows),
+        "URE": rng.uniform(1.0, 20.0, n_rows),
+    })
+
+
+def potentials_fixture(n_rows=200, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Q": rng.uniform(5.0, 200.0, n_rows),
+        "FluidDensity": rng.uniform(800.0, 1100.0, n_rows),
+        "oilWellopCountedOilDebit": rng.uniform(1.0, 50.0, n_rows),
+        "ure": rng.uniform(1.0, 20.0, n_rows),
+        "Q_freq_optimal": rng.uniform(5.0, 200.0, n_rows),
+        "potential_oil_rate_technical_limit": rng.uniform(5.0, 200.0, n_rows),
+        "power_esp_optimal": rng.uniform(10.0, 100.0, n_rows),
+        "Рекомендуемый УЭЦН": rng.choice(["ЭЦН-50", "Не удалось подобрать УЭЦН"], n_rows),
+    }, index=rng.permutation(n_rows))
+
+
+class TestFcfColumns(unittest.TestCase):
+    """every row of the columnar FCF equals Economics evaluated for that row alone"""
+
+    def test_fcf_columns(self):
+        df = opt_results_fixture()
+        columns = ["X_m3_day", "density_calc", "shtr_oil_debit", "URE"]
+        expected = [fcf_scalar(*row, ECONOMIC_PARAMS) for row in df[columns].itertuples(index=False)]
+        actual = fcf_columns(*(df[column] for column in columns), ECONOMIC_PARAMS)
+        np.testing.assert_allclose(actual, expected, rtol=1e-12)
+
+    def test_add_new_fcf(self):
+        df = opt_results_fixture()
+        actual = optimize.add_new_fcf(df.copy(), ECONOMIC_PARAMS)
+        expected = df.copy()
+        expected["Qn_new"] = df.apply(optimize.get_oil_debit, axis=1)
+        expected["URE_new"] = (
+            24 * df["res_pump_power_watt"] / (1000 * df["X_m3_day"] * df["density_calc"])
+        ).fillna(df["URE"])
+        expected["FCF_new"] = expected.apply(
+            lambda row: optimize.calculate_fcf(
+                row, ECONOMIC_PARAMS, q_col="X_m3_day", qn_col="Qn_new", ure_col="URE_new"
+            ),
+            axis=1,
+        )
+        pd.testing.assert_frame_equal(actual, expected, rtol=1e-12)
+
+    def test_potentials_calculate_fcf_columns(self):
+        df = potentials_fixture()
+        actual = model_potentials.calculate_fcf_columns(df, ECONOMIC_PARAMS)
+        expected = df.apply(lambda row: model_potentials.calculate_fcf(row, ECONOMIC_PARAMS), axis=1)
+        pd.testing.assert_frame_equal(actual, expected, rtol=1e-12)
+
+
+if __name__ == "__main__":
+    unittest.main()
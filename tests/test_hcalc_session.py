@@ -0,0 +1,75 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import pandas as pd
+
+from upstream_viz_lib.pages.pipe import hcalc_session
+
+INPUT_DF = pd.DataFrame({
+    "juncType": ["pipe", "pipe", "pipe"],
+    "model": [None, None, None],
+    "node_id_start": ["a", "b", "c"],
+    "node_id_end": ["b", "c", "d"],
+    "node_name_end": ["x", "y", "z"],
+    "productivity": [0.0, 2.0, 1.0],
+    "VolumeWater": [1, 2, 3],
+    "endIsOutlet": [True, None, True],
+    "endValue": [None, 3.0, None],
+    "__pad_num": [1, 2, 3],
+    "__well_num": ["1", "2", "3"],
+    "d": [1, 1, 1],
+    "s": [1, 1, 1],
+})
+
+
+def make_options(outlets):
+    return {
+        "liquid_properties": {"oil_density_kg_m3": ("826", "Плотность нефти")},
+        "outlets_dict": outlets,
+        "selected_dns": "ДНС-1",
+        "eff_diam": 0.85,
+    }
+
+
+def make_schema(df, folder=None):
+    # node boundary objects keyed by node id, pressure of the outlet is the node value
+    graph = SimpleNamespace(nodes={node: {"obj": SimpleNamespace(value=value)}
+                                   for node, value in zip(df["node_id_end"], df["endValue"])})
+    return graph, df.copy(), None
+
+
+def put_result(graph, calc_df, mapping):
+    return calc_df.assign(P=[graph.nodes[node]["obj"].value for node in calc_df["node_id_end"]])
+
+
+def make_solver(graph):
+    return SimpleNamespace(solve=lambda **kwargs: None, op_result=SimpleNamespace(success=True))
+
+
+@mock.patch.object(hcalc_session, "make_oilpipe_schema_from_OT_dataset", make_schema)
+@mock.patch.object(hcalc_session, "put_result_to_dataframe", put_result)
+@mock.patch.object(hcalc_session, "HE2_Solver", make_solver)
+@mock.patch.object(hcalc_session.ppr, "validate_solution", lambda graph: (True, ""))
+class TestHcalcSession(unittest.TestCase):
+    def test_warm_equals_cold(self):
+        session = hcalc_session.HcalcSession("data")
+        session.calculate(INPUT_DF, make_options({"x": 5.0, "z": 2.0}))
+        options = make_options({"x": 7.0, "z": 2.0})
+        warm = session.calculate(INPUT_DF, options)
+        self.assertEqual(session.last_mode, "warm")
+
+        cold_session = hcalc_session.HcalcSession("data")
+        cold = cold_session.calculate(INPUT_DF, options)
+        self.assertEqual(cold_session.last_mode, "cold")
+        pd.testing.assert_frame_equal(warm, cold)
+
+    def test_removed_outlet_is_solved_cold(self):
+        session = hcalc_session.HcalcSession("data")
+        session.calculate(INPUT_DF, make_options({"x": 5.0, "z": 2.0}))
+        session.calculate(INPUT_DF, make_options({"x": 5.0}))
+        self.assertEqual(session.last_mode, "cold")
+
+
+if __name__ == "__main__":
+    unittest.main()
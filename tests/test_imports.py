@@ -0,0 +1,27 @@
+import importlib
+import unittest
+
+# modules that must import without page templates (pipeline_production_static, hcalc_dashboard_static)
+MODULES = [
+    "upstream_viz_lib.pages.opt.optimize",
+    "upstream_viz_lib.pages.opt.search",
+    "upstream_viz_lib.pages.opt.prepared_schema",
+    "upstream_viz_lib.pages.opt.variant_store",
+    "upstream_viz_lib.pages.pipe.dns_load_store",
+    "upstream_viz_lib.pages.pipe.hcalc_dashboard_getdata",
+    "upstream_viz_lib.pages.pipe.hcalc_dashboard",
+    "upstream_viz_lib.pages.pipe.pipeline_production",
+    "upstream_viz_lib.pages.pipe.hcalc_session",
+    "upstream_viz_lib.pages.ppd.ppd_network_calc",
+]
+
+
+class TestImports(unittest.TestCase):
+    def test_modules_import(self):
+        for module in MODULES:
+            with self.subTest(module=module):
+                importlib.import_module(module)
+
+
+if __name__ == "__main__":
+    unittest.main()
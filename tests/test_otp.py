@@ -0,0 +1,26 @@
+import unittest
+
+import pandas as pd
+
+from upstream_viz_lib.common import otp
+
+
+class TestOtp(unittest.TestCase):
+    def test_iter_row_chunks(self):
+        rows = [{"a": i} for i in range(7)]
+        chunks = list(otp.iter_row_chunks(rows, chunk_size=3))
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 1])
+        self.assertEqual([row["a"] for chunk in chunks for row in chunk], list(range(7)))
+        self.assertEqual(rows, [])
+
+    @unittest.skipIf(otp.pa is None, "pyarrow is not installed")
+    def test_record_batch_missing_time(self):
+        rows = [{"_time": 1600000000, "a": 1}, {"_time": None, "a": 2}, {"_time": 1600000001.5, "a": 3}]
+        dt = otp.rows_to_record_batch(rows).column("dt").to_pandas()
+        expected = otp.rows_to_frame(rows)["dt"]
+        pd.testing.assert_series_equal(dt, expected, check_names=False)
+        self.assertTrue(pd.isna(dt[1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
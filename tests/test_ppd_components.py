@@ -0,0 +1,53 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from upstream_viz_lib.pages.ppd import ppd_network_calc
+
+NODES = pd.DataFrame({
+    "node_id": [1, 2, 3, 4, 5, 6],
+    "node_name": ["a", "b", "c", "d", "e", "f"],
+    "value": np.nan,
+})
+EDGES = pd.DataFrame({"node_id_start": [1, 2, 4], "node_id_end": [2, 3, 5]})
+
+
+def passthrough_solver(df_nodes, df_edges):
+    return df_nodes, df_edges, object()
+
+
+class TestSplitComponents(unittest.TestCase):
+    def test_node_without_edges_joins_largest_component(self):
+        components = ppd_network_calc.split_components(NODES, EDGES)
+        self.assertEqual([sorted(nodes["node_name"]) for nodes, _ in components], [["a", "b", "c", "f"], ["d", "e"]])
+        self.assertEqual([len(edges) for _, edges in components], [2, 1])
+
+    def test_empty_network(self):
+        self.assertEqual(ppd_network_calc.split_components(NODES.iloc[:0], EDGES.iloc[:0]), [])
+
+
+@mock.patch.object(ppd_network_calc, "split_nodes_df_to_groups", lambda df: (df.iloc[:0], df.iloc[:0], df))
+class TestAppByComponents(unittest.TestCase):
+    def test_empty_network(self):
+        with mock.patch.object(ppd_network_calc, "calculate_PPD_from_nodes_edges_df", passthrough_solver):
+            df_nodes, df_edges, graphs, failed = ppd_network_calc.app_by_components(EDGES.iloc[:0], NODES.iloc[:0])
+        self.assertTrue(df_nodes.empty and df_edges.empty)
+        self.assertEqual((graphs, failed), ([], []))
+
+    def test_failed_component_does_not_drop_others(self):
+        def solver(df_nodes, df_edges):
+            if 4 in set(df_nodes["node_id"]):
+                raise ValueError("not converged")
+            return passthrough_solver(df_nodes, df_edges)
+
+        with mock.patch.object(ppd_network_calc, "calculate_PPD_from_nodes_edges_df", solver):
+            df_nodes, df_edges, graphs, failed = ppd_network_calc.app_by_components(EDGES, NODES)
+        self.assertEqual(sorted(df_nodes["node_name"]), ["a", "b", "c", "f"])
+        self.assertEqual(len(graphs), 1)
+        self.assertEqual([(sorted(nodes["node_name"]), error) for nodes, error in failed], [(["d", "e"], "not converged")])
+
+
+if __name__ == "__main__":
+    unittest.main()
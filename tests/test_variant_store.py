@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+
+from upstream_viz_lib.pages.opt.variant_store import VariantStore, read_variant
+
+
+def variant_total(path):
+    return float(read_variant(path)["fcf"].sum())
+
+
+class TestVariantStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source_dir = os.path.join(self.tmp.name, "dns1")
+        os.makedirs(self.source_dir)
+        self.store = VariantStore(self.source_dir, cache_dir=os.path.join(self.tmp.name, "cache"))
+        self.write("good.csv", "wellNum,fcf\n1,2.0\n2,3.0\n")
+        self.write("broken.csv", "wellNum,fcf\n1,2.0\n2,3.0,4.0,5.0\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        with open(os.path.join(self.source_dir, name), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_failed_conversion_is_reported(self):
+        current = self.store.refresh(max_workers=1)
+        self.assertIsInstance(current["good.csv"], list)
+        self.assertIsInstance(current["broken.csv"], str)
+        self.assertEqual(self.store.read("good.csv")["fcf"].sum(), 5.0)
+
+    def test_scan_skips_failed_conversion(self):
+        ranking = self.store.scan(variant_total, context_key="test", max_workers=1)
+        self.assertEqual(ranking["variant"].tolist(), ["good.csv"])
+
+        self.write("broken.csv", "wellNum,fcf\n1,7.0\n")
+        ranking = self.store.scan(variant_total, context_key="test", max_workers=1)
+        self.assertEqual(ranking["variant"].tolist(), ["broken.csv", "good.csv"])
+
+
+if __name__ == "__main__":
+    unittest.main()
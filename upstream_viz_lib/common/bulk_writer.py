@@ -0,0 +1,160 @@
+import dataclasses
+import time
+from typing import Callable, List
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_float_dtype, is_integer_dtype, is_numeric_dtype
+
+from upstream_viz_lib.common.logger import logger
+
+COLS_DELIMITER = "###"
+ROWS_DELIMITER = "&&&"
+DEFAULT_CHUNK_BYTES = 1024 * 1024
+
+
+@dataclasses.dataclass
+class WriteReport:
+    rows: int
+    bytes: int
+    chunks: int
+    seconds: float
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else float("inf")
+
+    @property
+    def bytes_per_sec(self) -> float:
+        return self.bytes / self.seconds if self.seconds else float("inf")
+
+    def __str__(self):
+        return (
+            f"{self.rows} rows, {self.bytes} bytes in {self.chunks} chunks for {self.seconds:.2f} s "
+            f"({self.rows_per_sec:.0f} rows/s, {self.bytes_per_sec:.0f} bytes/s)"
+        )
+
+
+class BulkWriteError(Exception):
+    """
+    Chunk `failed_chunk` of `chunks` was not written. Chunks before it are in the dataset,
+    chunks after it were not sent; the failed chunk itself may or may not have been written.
+    """
+
+    def __init__(self, path: str, failed_chunk: int, chunks: int, error: Exception):
+        self.path = path
+        self.failed_chunk = failed_chunk
+        self.chunks = chunks
+        self.error = error
+        super().__init__(
+            f"Writing {path=} failed at chunk {failed_chunk + 1} of {chunks}, "
+            f"dataset holds the first {failed_chunk} chunks: {error}"
+        )
+
+
+def encode_column(series: pd.Series) -> pd.Series:
+    """
+    Encode column values as strings for the query literal.
+    Integral floats lose trailing '.0', quotes and backslashes in strings are escaped.
+    """
+    if is_numeric_dtype(series):
+        encoded = series.astype(str).astype(object)
+        encoded[series.isna().to_numpy()] = "nan"
+        if is_float_dtype(series):
+            encoded = encoded.str.replace(r"\.0$", "", regex=True)
+        return encoded
+
+    encoded = pd.Series([str(v) for v in series.to_numpy(dtype=object)], index=series.index, dtype=object)
+    return encoded.str.replace("\\", "\\\\", regex=False).str.replace('"', '\\"', regex=False)
+
+
+def encode_rows(df: pd.DataFrame) -> pd.Series:
+    """Encode every row as string with columns joined by COLS_DELIMITER. Rows of a frame without columns are empty."""
+    encoded = pd.Series("", index=df.index, dtype=object)
+    for i, col in enumerate(df.columns):
+        values = encode_column(df[col])
+        encoded = values if i == 0 else encoded + COLS_DELIMITER + values
+    return encoded
+
+
+def split_encoded_rows(encoded: pd.Series, chunk_bytes: int) -> List[pd.Series]:
+    """Split encoded rows into consecutive chunks of about chunk_bytes bytes (UTF-8) each."""
+    sizes = encoded.str.encode("utf-8").str.len().to_numpy() + len(ROWS_DELIMITER)
+    chunk_ids = (np.cumsum(sizes) - sizes) // chunk_bytes
+    bounds = np.flatnonzero(np.diff(chunk_ids)) + 1
+    return [encoded.iloc[start:stop] for start, stop in zip(np.r_[0, bounds], np.r_[bounds, len(encoded)])]
+
+
+def build_write_query(df: pd.DataFrame, payload: str, path: str, write_format: str, mode: str) -> str:
+    colnames = ",".join(col.replace(" ", "_") for col in df.columns)
+
+    numeric_casts = []
+    for col in df.columns:
+        if is_numeric_dtype(df[col]):
+            func = "floor" if is_integer_dtype(df[col]) else "tonumber"
+            name = col.replace(" ", "_")
+            numeric_casts.append(f"| eval {name} = {func}({name})")
+    numeric_casts_joined = "\n        ".join(numeric_casts)
+
+    return f"""
+        | makeresults count=1
+        | eval _total_string = "{payload}"
+        | eval _split_string = split(_total_string, "{ROWS_DELIMITER}")
+        | mvexpand _split_string
+        | split _split_string cols={colnames} sep={COLS_DELIMITER}
+        | fields - _total_string, _split_string
+        {numeric_casts_joined}
+        | repartition num=1
+        | put mode={mode} format={write_format} path={path}
+    """
+
+
+def write_df(
+    df: pd.DataFrame,
+    path: str,
+    run_query: Callable[[str], pd.DataFrame],
+    write_format: str = "csv",
+    mode: str = "overwrite",
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+) -> (List[pd.DataFrame], WriteReport):
+    """
+    Write dataframe to OT Platform by size-bounded chunks, one chunk at a time in row order.
+
+    The first chunk is written with requested `mode`, so overwrite still replaces the dataset,
+    the rest of the chunks are appended. Chunks are never resent: `run_query` must not retry writes,
+    a retried append could write the same rows twice.
+
+    On failure BulkWriteError is raised and the dataset is left partial: with mode=overwrite it holds
+    only the chunks written before the failed one. Write the dataframe again with mode=overwrite to recover.
+
+    :param run_query: Function that runs query on OT Platform without retries,
+        e.g. lambda query: otp.get_data_no_cache(query, retry=False).
+    :return: Results of chunk queries in chunk order and write report.
+        Nothing is written for a dataframe without columns.
+    """
+    start = time.perf_counter()
+    if df.columns.empty:
+        logger.warning(f"Dataframe without columns is not written to {path=}")
+        return [], WriteReport(rows=len(df), bytes=0, chunks=0, seconds=time.perf_counter() - start)
+    chunks = split_encoded_rows(encode_rows(df), chunk_bytes)
+    payloads = [ROWS_DELIMITER.join(chunk) for chunk in chunks]
+    queries = [
+        build_write_query(df, payload, path, write_format, mode if i == 0 else "append")
+        for i, payload in enumerate(payloads)
+    ]
+
+    results = []
+    for i, query in enumerate(queries):
+        try:
+            results.append(run_query(query))
+        except Exception as err:
+            raise BulkWriteError(path, i, len(queries), err) from err
+
+    report = WriteReport(
+        rows=len(df),
+        bytes=sum(len(p.encode("utf-8")) for p in payloads),
+        chunks=len(queries),
+        seconds=time.perf_counter() - start,
+    )
+    logger.info(f"Dataset written to {path=}: {report}")
+    return results, report
@@ -0,0 +1,208 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from upstream_viz_lib import config
+from upstream_viz_lib.common.logger import logger
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_MAX_IDLE = 300
+DEFAULT_HEALTH_CHECK_AFTER = 30
+HEALTH_CHECK_QUERY = "| makeresults count=1"
+
+
+class ConnectorPool:
+    """
+    Process-wide pool of long-lived OT Platform connectors.
+
+    Connectors are built once and handed out again after each query, so the HTTP session
+    (keep-alive connections and auth cookie) is reused instead of being created per query.
+    Connectors idle longer than `max_idle` seconds or failing `health_check` are rebuilt;
+    the check runs only on connectors idle longer than `health_check_after` seconds.
+    A connector that raised a network error (OSError) is dropped and the query is retried
+    once on a fresh connector.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        size: int = DEFAULT_POOL_SIZE,
+        max_idle: float = DEFAULT_MAX_IDLE,
+        health_check: Optional[Callable[[Any], bool]] = None,
+        health_check_after: float = 0,
+    ):
+        self.factory = factory
+        self.size = size
+        self.max_idle = max_idle
+        self.health_check = health_check
+        self.health_check_after = health_check_after
+
+        self._idle = deque()  # (connector, last used timestamp)
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._stats = {
+            "created": 0,
+            "reused": 0,
+            "discarded": 0,
+            "expired": 0,
+            "unhealthy": 0,
+            "retries": 0,
+            "in_use": 0,
+        }
+
+    def _count(self, key: str, value: int = 1):
+        with self._lock:
+            self._stats[key] += value
+
+    def _pop_idle(self) -> Optional[Any]:
+        with self._lock:
+            if not self._idle:
+                return None
+            conn, last_used = self._idle.pop()
+
+        idle = time.monotonic() - last_used
+        if idle > self.max_idle:
+            self._count("expired")
+            return None
+        if self.health_check is not None and idle > self.health_check_after and not self.health_check(conn):
+            self._count("unhealthy")
+            return None
+        return conn
+
+    def acquire(self) -> (Any, bool):
+        """Take a connector from the pool. Blocks while all `size` connectors are in use.
+        Returns connector and a flag whether it was reused."""
+        self._slots.acquire()
+        try:
+            conn = self._pop_idle()
+            reused = conn is not None
+            if reused:
+                self._count("reused")
+            else:
+                conn = self.factory()
+                self._count("created")
+        except Exception:
+            self._slots.release()
+            raise
+        self._count("in_use")
+        return conn, reused
+
+    def release(self, conn: Any, discard: bool = False):
+        if discard:
+            self._count("discarded")
+        else:
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+        self._count("in_use", -1)
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn, _ = self.acquire()
+        discard = False
+        try:
+            yield conn
+        except OSError:
+            discard = True
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def run(
+        self,
+        func: Callable[[Any], Any],
+        retry: bool = True,
+        on_acquire: Optional[Callable[[bool], None]] = None,
+    ) -> Any:
+        """Call func(connector) on a pooled connector.
+        Network errors drop the connector and the call is retried once on a new one.
+        Pass retry=False for calls that must not run twice, e.g. writes: the failed call
+        may have reached the platform before the error.
+        on_acquire is called with the reused flag of every connector taken for the call."""
+        for attempt in range(2 if retry else 1):
+            conn, reused = self.acquire()
+            logger.debug(f"Query on {'reused' if reused else 'new'} connector")
+            if on_acquire is not None:
+                on_acquire(reused)
+            try:
+                result = func(conn)
+            except OSError as err:
+                self.release(conn, discard=True)
+                if attempt or not retry:
+                    raise
+                logger.warning(f"Connector failed, reconnecting: {err}")
+                self._count("retries")
+                continue
+            except Exception:
+                self.release(conn)
+                raise
+            self.release(conn)
+            return result
+
+    def clear(self):
+        """Drop all idle connectors, e.g. after credentials change."""
+        with self._lock:
+            self._stats["discarded"] += len(self._idle)
+            self._idle.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "idle": len(self._idle), "size": self.size}
+
+
+def query_health_check(query: str = HEALTH_CHECK_QUERY) -> Callable[[Any], bool]:
+    """
+    Health check running a tiny query on the connector.
+    Passes only if the platform is reachable and the session is still authorized.
+    """
+
+    def check(conn) -> bool:
+        try:
+            conn.jobs.create(query, cache_ttl=0).dataset.load()
+        except Exception as err:
+            logger.info(f"Connector health check failed: {err!r}")
+            return False
+        return True
+
+    return check
+
+
+_pool: Optional[ConnectorPool] = None
+_pool_conf = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectorPool:
+    """
+    Return process-wide pool, build it from `rest` and `rest_pool` config sections on first call.
+    Idle connectors are checked with `rest_pool.health_check_query` (empty disables the check).
+    The pool is rebuilt when the config file changes.
+    """
+    global _pool, _pool_conf
+    if _pool is not None and _pool_conf is None:
+        return _pool  # set by set_pool
+    conf = config.get_conf()
+    if _pool is None or (_pool_conf is not None and _pool_conf is not conf):
+        with _pool_lock:
+            if _pool is None or (_pool_conf is not None and _pool_conf is not conf):
+                pool_conf = conf.get("rest_pool") or {}
+                health_check_query = pool_conf.get("health_check_query", HEALTH_CHECK_QUERY)
+                _pool = ConnectorPool(
+                    factory=config.get_rest_connector,
+                    size=pool_conf.get("size", DEFAULT_POOL_SIZE),
+                    max_idle=pool_conf.get("max_idle", DEFAULT_MAX_IDLE),
+                    health_check=query_health_check(health_check_query) if health_check_query else None,
+                    health_check_after=pool_conf.get("health_check_after", DEFAULT_HEALTH_CHECK_AFTER),
+                )
+                _pool_conf = conf
+    return _pool
+
+
+def set_pool(pool: Optional[ConnectorPool]) -> Optional[ConnectorPool]:
+    """Replace process-wide pool (None resets it to config defaults). Returns previous pool."""
+    global _pool, _pool_conf
+    with _pool_lock:
+        previous, _pool, _pool_conf = _pool, pool, None
+    return previous
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+
+from upstream_viz_lib.common.logger import logger
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def frame_digest(df: pd.DataFrame, *extra: Any) -> str:
+    """
+    Stable content hash of df (values, index, column names and dtypes) and json-serializable extra objects.
+    Raises TypeError for frames with unhashable values (lists, dicts) in object columns.
+    """
+    h = hashlib.sha1()
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    h.update(json.dumps([list(map(str, df.columns)), list(map(str, df.dtypes))]).encode("utf-8"))
+    for obj in extra:
+        h.update(json.dumps(obj, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+class DataFrameCache:
+    """
+    Thread-safe LRU cache of DataFrames with per-entry TTL and a memory budget in bytes.
+
+    If `spill_dir` is set, every stored frame is also written there as parquet
+    (with a json sidecar holding the key and expiry time), so entries survive restarts
+    and frames evicted from memory can be loaded back while they are not expired.
+    Frames are copied on put and get, callers are free to modify returned frames.
+    """
+
+    def __init__(self, max_bytes: int, spill_dir: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+        self._entries = OrderedDict()  # key -> (df, nbytes, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def _spill_path(self, key: str) -> str:
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.spill_dir, name)
+
+    def _drop(self, key: str):
+        _, nbytes, _ = self._entries.pop(key)
+        self._bytes -= nbytes
+
+    def _store(self, key: str, df: pd.DataFrame, nbytes: int, expires_at: Optional[float]):
+        if key in self._entries:
+            self._drop(key)
+        if nbytes > self.max_bytes:
+            return
+        self._entries[key] = (df, nbytes, expires_at)
+        self._bytes += nbytes
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self._stats["evictions"] += 1
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                df, _, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return df.copy()
+                self._drop(key)
+                self._stats["expired"] += 1
+
+        df = self._load_spilled(key, now)
+        with self._lock:
+            if df is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+        return df
+
+    def put(self, key: str, df: pd.DataFrame, ttl: Optional[float] = None):
+        """Store copy of df. ttl=None means entry never expires (only evicted)."""
+        expires_at = time.time() + ttl if ttl is not None else None
+        df = df.copy()
+        with self._lock:
+            self._store(key, df, frame_nbytes(df), expires_at)
+        self._spill(key, df, expires_at)
+
+    def _spill(self, key: str, df: pd.DataFrame, expires_at: Optional[float]):
+        if not self.spill_dir:
+            return
+        path = self._spill_path(key)
+        try:
+            df.to_parquet(f"{path}.parquet")
+            with open(f"{path}.json", "w", encoding="utf-8") as f:
+                json.dump({"key": key, "expires_at": expires_at}, f)
+        except Exception as err:
+            logger.warning(f"Cannot spill cached dataframe to {path}: {err}")
+
+    def _load_spilled(self, key: str, now: float) -> Optional[pd.DataFrame]:
+        if not self.spill_dir:
+            return None
+        path = self._spill_path(key)
+        try:
+            with open(f"{path}.json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["key"] != key:
+                return None
+            expires_at = meta["expires_at"]
+            if expires_at is not None and expires_at <= now:
+                self._remove_spilled(path)
+                return None
+            df = pd.read_parquet(f"{path}.parquet")
+        except FileNotFoundError:
+            return None
+        except Exception as err:
+            logger.warning(f"Cannot read spilled dataframe {path}: {err}")
+            return None
+
+        with self._lock:
+            self._store(key, df, frame_nbytes(df), expires_at)
+        return df.copy()
+
+    @staticmethod
+    def _remove_spilled(path: str):
+        for ext in ("json", "parquet"):
+            try:
+                os.remove(f"{path}.{ext}")
+            except FileNotFoundError:
+                pass
+
+    def invalidate(self, predicate: Callable[[str], bool]) -> int:
+        """Drop entries (including spilled ones) whose key matches predicate. Returns number of dropped entries."""
+        with self._lock:
+            keys = [k for k in self._entries if predicate(k)]
+            for k in keys:
+                self._drop(k)
+
+        dropped = set(keys)
+        if self.spill_dir:
+            for name in os.listdir(self.spill_dir):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(self.spill_dir, name[:-len(".json")])
+                try:
+                    with open(f"{path}.json", "r", encoding="utf-8") as f:
+                        key = json.load(f)["key"]
+                except Exception:
+                    continue
+                if predicate(key):
+                    self._remove_spilled(path)
+                    dropped.add(key)
+        return len(dropped)
+
+    def clear(self):
+        self.invalidate(lambda _: True)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
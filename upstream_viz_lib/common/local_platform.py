@@ -0,0 +1,139 @@
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+from upstream_viz_lib.common import connector_pool
+from upstream_viz_lib.common.bulk_writer import COLS_DELIMITER, ROWS_DELIMITER
+from upstream_viz_lib.common.connector_pool import ConnectorPool
+
+Rows = List[dict]
+DatasetSource = Union[pd.DataFrame, Rows, Callable[[str, int, int], Rows]]
+
+
+class LocalDataset:
+    def __init__(self, platform: "LocalPlatform", rows: Rows):
+        self.platform = platform
+        self.rows = rows
+
+    def load(self) -> Rows:
+        self.platform.sleep(self.platform.row_latency * len(self.rows))
+        return list(self.rows)
+
+
+class LocalJob:
+    def __init__(self, platform: "LocalPlatform", query: str, tws: int, twf: int, cache_ttl: int):
+        self.query = query
+        self.tws = tws
+        self.twf = twf
+        self.cache_ttl = cache_ttl
+        self.dataset = LocalDataset(platform, platform.run(query, tws, twf))
+
+
+class LocalJobs:
+    def __init__(self, platform: "LocalPlatform"):
+        self.platform = platform
+
+    def create(self, query_text: str, cache_ttl: int = 60, tws: int = 0, twf: int = 0, **kwargs) -> LocalJob:
+        self.platform.sleep(self.platform.latency)
+        return LocalJob(self.platform, query_text, tws, twf, cache_ttl)
+
+
+class LocalPlatform:
+    """
+    In-process stand-in for ot_simple_connector.Connector, for benchmarks and local runs.
+
+    Implements `jobs.create(...).dataset.load()`. Datasets are registered by regexp matched
+    against query text and may be a DataFrame, list of rows or function (query, tws, twf) -> rows.
+    Write queries built by otp.load_df (makeresults ... | put) are decoded and stored by path,
+    stored datasets are served to queries containing `path=<path>`.
+    `latency` seconds is added to every job and `row_latency` seconds per loaded row.
+    """
+
+    def __init__(self, latency: float = 0.0, row_latency: float = 0.0):
+        self.latency = latency
+        self.row_latency = row_latency
+        self.jobs = LocalJobs(self)
+        self.queries: List[str] = []
+        self.storage: Dict[str, Rows] = {}
+        self._datasets = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def sleep(seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def add_dataset(self, pattern: str, source: DatasetSource):
+        """Serve source to queries matching regexp pattern. Later datasets take precedence."""
+        if isinstance(source, pd.DataFrame):
+            source = source.to_dict(orient="records")
+        self._datasets.insert(0, (re.compile(pattern), source))
+
+    def run(self, query: str, tws: int = 0, twf: int = 0) -> Rows:
+        with self._lock:
+            self.queries.append(query)
+
+        if "| put " in query:
+            return self._put(query)
+
+        for pattern, source in self._datasets:
+            if pattern.search(query):
+                return source(query, tws, twf) if callable(source) else source
+
+        path = re.search(r"path=(\S+)", query)
+        if path is not None:
+            with self._lock:
+                return list(self.storage.get(path.group(1), []))
+        return []
+
+    def _put(self, query: str) -> Rows:
+        payload = re.search(r'_total_string = "((?:[^"\\]|\\.)*)"', query).group(1)
+        payload = re.sub(r"\\(.)", r"\1", payload)
+        columns = re.search(r"cols=(\S+)", query).group(1).split(",")
+        mode = re.search(r"put mode=(\w+)", query).group(1)
+        path = re.search(r"put .*path=(\S+)", query).group(1)
+
+        rows = [
+            dict(zip(columns, row.split(COLS_DELIMITER)))
+            for row in payload.split(ROWS_DELIMITER)
+            if row
+        ]
+        with self._lock:
+            if mode == "append":
+                self.storage.setdefault(path, []).extend(rows)
+            else:
+                self.storage[path] = rows
+        return []
+
+    def connector(self) -> "LocalPlatform":
+        """Connector factory for ConnectorPool, the platform itself is the connector"""
+        return self
+
+    @contextmanager
+    def installed(self, pool_size: int = connector_pool.DEFAULT_POOL_SIZE):
+        """Route otp queries to this platform inside the block."""
+        previous = connector_pool.set_pool(ConnectorPool(self.connector, size=pool_size))
+        try:
+            yield self
+        finally:
+            connector_pool.set_pool(previous)
+
+
+def synthetic_well_metrics(n_rows: int, n_wells: int = 500, seed: int = 0) -> pd.DataFrame:
+    """Well metrics dataset shaped as in well params pages: _time, __deposit, __well_num, metric, value."""
+    rng = np.random.default_rng(seed)
+    metrics = np.array(["adkuWellLiquidDebit", "adkuWellInputPressure", "adkuControlStationFrequency", "water"])
+    wells = rng.integers(1, n_wells + 1, n_rows)
+    return pd.DataFrame({
+        "_time": 1672531200 + rng.integers(0, 86400 * 30, n_rows),
+        "__deposit": "Месторождение",
+        "__pad_num": (wells // 10).astype(str),
+        "__well_num": wells.astype(str),
+        "metric_name": metrics[rng.integers(0, len(metrics), n_rows)],
+        "value": rng.normal(100.0, 15.0, n_rows).round(2),
+    })
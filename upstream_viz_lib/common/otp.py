@@ -1,12 +1,97 @@
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
 import pandas as pd
-from pandas.api.types import is_numeric_dtype, is_integer_dtype
 from upstream_viz_lib.common.logger import logger
+from upstream_viz_lib.common import bulk_writer, connector_pool, query_metrics
+from upstream_viz_lib.common.df_cache import DataFrameCache
+from upstream_viz_lib.common.query_template import compile_template
+from upstream_viz_lib.common.single_flight import SingleFlight
 from upstream_viz_lib import config
 
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+DEFAULT_CACHE_MAX_MB = 256
+DEFAULT_CHUNK_SIZE = 100_000
+
+_query_cache: Optional[DataFrameCache] = None
+_query_cache_lock = threading.Lock()
+
+in_flight_queries = SingleFlight()
+
+
+def get_query_cache() -> DataFrameCache:
+    """Return process-wide cache of query results, build it from `query_cache` config section on first call."""
+    global _query_cache
+    if _query_cache is None:
+        with _query_cache_lock:
+            if _query_cache is None:
+                cache_conf = config.get_conf().get("query_cache") or {}
+                _query_cache = DataFrameCache(
+                    max_bytes=int(cache_conf.get("max_mb", DEFAULT_CACHE_MAX_MB) * 1024 * 1024),
+                    spill_dir=cache_conf.get("spill_dir"),
+                )
+    return _query_cache
+
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace outside of double-quoted strings."""
+    return re.sub(
+        r'("(?:[^"\\]|\\.)*")|\s+',
+        lambda m: m.group(1) or " ",
+        query,
+    ).strip()
+
+
+def query_cache_key(query: str, tws=0, twf=0) -> str:
+    return _cache_key(normalize_query(query), tws, twf)
+
+
+def _cache_key(normalized_query: str, tws, twf) -> str:
+    return f"{tws}:{twf}:{normalized_query}"
+
 
 def get_data(query: str, tws=0, twf=0, ttl=60) -> pd.DataFrame:
-    return get_data_no_cache(query, tws, twf, ttl)
+    """
+    Run query on OT Platform, reusing a local result for `ttl` seconds.
+    ttl <= 0 disables local cache.
+    Identical queries running at the same moment share one platform job.
+    """
+    normalized = normalize_query(query)
+    key = _cache_key(normalized, tws, twf)
+    if ttl > 0:
+        timer = query_metrics.registry.start(normalized, cache="hit")
+        df = get_query_cache().get(key)
+        if df is not None:
+            logger.debug(f"Query result taken from cache: {key}")
+            timer.finish(df)
+            return df
+
+    fetched = []
+
+    def fetch():
+        fetched.append(True)
+        _df = _run_query(query, tws, twf, ttl, normalized, cache="miss" if ttl > 0 else "bypass")
+        if ttl > 0:
+            get_query_cache().put(key, _df, ttl=ttl)
+        return _df
+
+    timer = query_metrics.registry.start(normalized, cache="coalesced")
+    try:
+        df, shared = in_flight_queries.do(key, fetch)
+    except QueryError as err:
+        if not fetched:
+            timer.finish(error=err)
+        raise
+    if not fetched:
+        timer.finish(df)
+    return df.copy() if shared else df
 
 
 class QueryError(Exception):
@@ -15,118 +100,247 @@ class QueryError(Exception):
         super().__init__(self.message)
 
 
-def get_data_no_cache(query: str, tws=0, twf=0, ttl=60) -> pd.DataFrame:
+def get_data_no_cache(query: str, tws=0, twf=0, ttl=60, retry=True) -> pd.DataFrame:
     """
     Run query on OT Platform.
     Return query result.
     Raise QueryError if cannot get result.
+    retry=False disables the retry on network errors, see ConnectorPool.run.
     """
+    return _run_query(query, tws, twf, ttl, normalize_query(query), cache="bypass", retry=retry)
+
 
-    conn = config.get_rest_connector()
+def _run_query(query: str, tws, twf, ttl, normalized_query: str, cache: str, retry=True) -> pd.DataFrame:
+    timer = query_metrics.registry.start(normalized_query, cache=cache)
     logger.info(f"Run query: {query}")
     try:
-        df = pd.DataFrame(
-            conn.jobs.create(query, cache_ttl=ttl, tws=tws, twf=twf).dataset.load()
+        rows = load_rows(
+            query, tws, twf, ttl, on_ready=timer.mark_first_byte, retry=retry, on_acquire=timer.mark_connector
         )
-        if "_time" in df.columns:
-            df["dt"] = pd.to_datetime(df["_time"], unit="s")
+        df = add_dt(pd.DataFrame(rows))
     except Exception as err:
+        timer.finish(error=err)
         raise QueryError(err)
 
+    record = timer.finish(df)
+    logger.info(f"Query {record.fingerprint} done in {record.total_s:.2f} s: {record.rows} rows")
     return df
 
 
+def load_rows(
+    query: str,
+    tws=0,
+    twf=0,
+    ttl=60,
+    on_ready: Optional[Callable[[], None]] = None,
+    retry=True,
+    on_acquire: Optional[Callable[[bool], None]] = None,
+) -> List[dict]:
+    """
+    Run query on pooled connector and return dataset rows as list of dicts.
+    on_ready is called when the job is done and its dataset is about to be downloaded,
+    on_acquire with the reused flag of the connector, see ConnectorPool.run.
+    """
+
+    def run(conn):
+        job = conn.jobs.create(query, cache_ttl=ttl, tws=tws, twf=twf)
+        if on_ready is not None:
+            on_ready()
+        return job.dataset.load()
+
+    return connector_pool.get_pool().run(run, retry=retry, on_acquire=on_acquire)
+
+
+def add_dt(df: pd.DataFrame) -> pd.DataFrame:
+    if "_time" in df.columns:
+        df["dt"] = pd.to_datetime(df["_time"], unit="s")
+    return df
+
+
+def get_data_many(
+    queries: Sequence[Union[str, Tuple[str, int, int]]],
+    tws=0,
+    twf=0,
+    ttl=60,
+    return_exceptions=False,
+) -> List[Union[pd.DataFrame, QueryError]]:
+    """
+    Run several independent queries on OT Platform concurrently.
+
+    :param queries: Query strings or (query, tws, twf) tuples to override default time window.
+    :param tws: Default time window start.
+    :param twf: Default time window finish.
+    :param ttl: Cache ttl, as in get_data.
+    :param return_exceptions: Put QueryError of failed query into result list instead of raising it.
+    :return: Results in the same order as queries.
+    Raise QueryError of the first failed query (in queries order) unless return_exceptions is set.
+    """
+    jobs = [(q, tws, twf) if isinstance(q, str) else tuple(q) for q in queries]
+    if not jobs:
+        return []
+
+    caller = query_metrics.find_caller()
+
+    def run(job):
+        try:
+            with query_metrics.called_from(caller):
+                return get_data(*job, ttl=ttl)
+        except QueryError as err:
+            return err
+        except Exception as err:
+            return QueryError(err)
+
+    workers = min(len(jobs), connector_pool.get_pool().size)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(run, jobs))
+
+    if not return_exceptions:
+        for result in results:
+            if isinstance(result, QueryError):
+                raise result
+    return results
+
+
+def iter_row_chunks(rows: List[dict], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[dict]]:
+    """
+    Yield rows by chunks of chunk_size.
+    Yielded rows are released from `rows` while it is consumed, the list is empty at the end.
+    """
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        rows[start:start + chunk_size] = [None] * len(chunk)  # release without shifting the rest of the list
+        yield chunk
+    rows.clear()
+
+
+def rows_to_frame(rows: List[dict], schema: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """Build DataFrame from rows. With schema {column: dtype} columns are selected and cast once."""
+    if schema is None:
+        return add_dt(pd.DataFrame.from_records(rows))
+    df = pd.DataFrame.from_records(rows, columns=list(schema)).astype(schema, copy=False)
+    return add_dt(df)
+
+
+def _arrow_type(dtype: Any):
+    if isinstance(dtype, pa.DataType):
+        return dtype
+    if dtype in (str, "str", "string", "object"):
+        return pa.string()
+    return pa.from_numpy_dtype(np.dtype(dtype))
+
+
+def rows_to_record_batch(rows: List[dict], schema: Optional[Dict[str, Any]] = None):
+    """Build pyarrow RecordBatch from rows, schema {column: pyarrow type or numpy dtype} is optional."""
+    arrow_schema = pa.schema([(k, _arrow_type(v)) for k, v in schema.items()]) if schema else None
+    batch = pa.RecordBatch.from_pylist(rows, schema=arrow_schema)
+    if "_time" in batch.schema.names:
+        seconds = batch.column("_time").cast(pa.float64()).to_numpy(zero_copy_only=False)
+        missing = np.isnan(seconds)
+        nanoseconds = (np.where(missing, 0.0, seconds) * 1e9).astype("int64")
+        dt = pa.array(nanoseconds, type=pa.timestamp("ns"), mask=missing)
+        batch = pa.RecordBatch.from_arrays(batch.columns + [dt], names=batch.schema.names + ["dt"])
+    return batch
+
+
+def get_data_iter(
+    query: str,
+    tws=0,
+    twf=0,
+    ttl=60,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    schema: Optional[Dict[str, Any]] = None,
+    as_arrow: bool = False,
+) -> Iterator[Union[pd.DataFrame, "pa.RecordBatch"]]:
+    """
+    Run query on OT Platform and yield result by typed chunks instead of one DataFrame.
+    Consumed rows are released while iterating, so memory stays bounded by one chunk
+    plus the not yet consumed part of the dataset.
+
+    :param chunk_size: Number of rows in chunk.
+    :param schema: {column: dtype}. Only these columns are kept and cast to given dtypes,
+        so every chunk has the same columns and types.
+    :param as_arrow: Yield pyarrow RecordBatches instead of DataFrames.
+    Raise QueryError if cannot get result.
+    """
+    if as_arrow and pa is None:
+        raise ImportError("pyarrow is required for get_data_iter(as_arrow=True)")
+
+    timer = query_metrics.registry.start(normalize_query(query), cache="stream")
+    logger.info(f"Run query by chunks: {query}")
+    try:
+        rows = load_rows(query, tws, twf, ttl, on_ready=timer.mark_first_byte, on_acquire=timer.mark_connector)
+    except Exception as err:
+        timer.finish(error=err)
+        raise QueryError(err)
+
+    to_chunk = rows_to_record_batch if as_arrow else rows_to_frame
+    n_rows, n_columns, n_bytes = 0, 0, 0
+    try:
+        for chunk in iter_row_chunks(rows, chunk_size):
+            chunk = to_chunk(chunk, schema)
+            n_rows += chunk.num_rows if as_arrow else len(chunk)
+            n_columns = chunk.num_columns if as_arrow else chunk.shape[1]
+            n_bytes += chunk.nbytes if as_arrow else int(chunk.memory_usage(index=False).sum())
+            yield chunk
+    finally:
+        timer.finish(rows=n_rows, columns=n_columns, nbytes=n_bytes)
+
+
 def render_query(query_template: str, query_params: dict) -> str:
     """
     Replace tokens in query with query_params dict.
+    Values are put as is, see query_template.QueryTemplate for escaping.
 
     :param query_template: Query template with tokens or placeholders.
     :param query_params: Dict with replacements.
     :return: Query ready to run.
     """
-    return_query = query_template
-    for k, v in query_params.items():
-        return_query = return_query.replace(k, v)
-    return return_query
+    template = compile_template(query_template, tokens=tuple(query_params), escape=False)
+    return template.render(query_params)
 
 
 def beta_render_query(query_template, options, token_prefix="__", token_suffix="__"):
     """Replace tokens in query with 'options' dict.
     Tokens descovered automatically with specified prefix and suffix.
-    'Options' dict must contain keys with the same names as tokens (case-insensitive)."""
+    'Options' dict must contain keys with the same names as tokens."""
 
-    def escape_chars(word: str):
-        returned_word = word
-        special_chars = """^$.|?*+()[]{}"""
-        for char in special_chars:
-            returned_word = returned_word.replace(char, f"""\\{char}""")
-        return returned_word
+    template = compile_template(query_template, token_prefix=token_prefix, token_suffix=token_suffix, escape=False)
+    return template.render(options)
 
-    def wrap(word):
-        prefix = escape_chars(token_prefix)
-        suffix = escape_chars(token_suffix)
-        logger.debug(f"Wrap word {word} with {prefix} and {suffix}")
-        return f"{prefix}{word}{suffix}"
 
-    # Collect all required tokens from query template. Check if all required tokens are in 'options' dict.
-    regexp = wrap("(.+?)")
-    required_keys = re.findall(regexp, query_template)
-    is_missed = (k not in options.keys() for k in required_keys)
-    if any(is_missed):
-        raise KeyError(f"""Not enough params for query. 
-        Required params: {required_keys}. 
-        Received params: {options.keys()}""")
-
-    query = query_template
-    for key in required_keys:
-        token = wrap(key)
-        query = query.replace(token, str(options[key]))
-
-    return query
-
-
-def load_df(df: pd.DataFrame, path: str, write_format: str = "csv", mode: str = "overwrite"):
+def load_df(
+    df: pd.DataFrame,
+    path: str,
+    write_format: str = "csv",
+    mode: str = "overwrite",
+    chunk_bytes: int = bulk_writer.DEFAULT_CHUNK_BYTES,
+):
     """
     Send dataframe to OT Platform and write it to the external_data folder.
-    Return result of corresponding OTL query
+    Large dataframes are sent by chunks of about chunk_bytes, see bulk_writer.write_df.
+    Write queries are not retried. If a chunk fails, QueryError is raised and the dataset
+    holds only the chunks written before it (see bulk_writer.BulkWriteError).
+    Return result of the last chunk OTL query
     """
 
     # If path was get from get_data.yaml, it likley contains 'path='
     path = get_path_from_string(path)
 
-    cols_delimiter = "###"
-    rows_delimiter = "&&&"
-
-    rows = [
-        cols_delimiter.join(str(v) for _, v in row.items())
-        for row in df.to_dict(orient="records")
-    ]
-
-    df_as_string = rows_delimiter.join(rows)
-    colnames = ",".join(col.replace(" ", "_") for col in df.columns)
-
-    numeric_casts = []
-    for col in df.columns:
-        if is_numeric_dtype(df[col]):
-            func = "floor" if is_integer_dtype(df[col]) else "tonumber"
-            q = f"eval {col} = {func}({col})"
-            numeric_casts.append(q)
-    numeric_casts_joined = " | ".join(numeric_casts)
-
-    query = f"""
-        | makeresults count=1
-        | eval _total_string = "{df_as_string}"
-        | eval _split_string = split(_total_string, "{rows_delimiter}")
-        | mvexpand _split_string
-        | split _split_string cols={colnames} sep={cols_delimiter}
-        | fields - _total_string, _split_string
-        | {numeric_casts_joined}
-        | repartition num=1
-        | put mode={mode} format={write_format} path={path}
-    """
-
     logger.info(f"Starting to write dataset: {path=}, {write_format=}, {mode=}")
-    return get_data(query)
+    try:
+        results, _ = bulk_writer.write_df(
+            df,
+            path,
+            run_query=lambda query: get_data_no_cache(query, retry=False),
+            write_format=write_format,
+            mode=mode,
+            chunk_bytes=chunk_bytes,
+        )
+    except bulk_writer.BulkWriteError as err:
+        raise QueryError(str(err)) from err
+    finally:
+        get_query_cache().invalidate(lambda key: path in key)
+    return results[-1]
 
 
 def get_path_from_string(string: str) -> str:
@@ -0,0 +1,209 @@
+import dataclasses
+import hashlib
+import json
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from upstream_viz_lib.common.logger import logger
+
+DEFAULT_MAX_RECORDS = 1000
+QUERY_SAMPLE_LENGTH = 300
+
+# Frames of these modules are skipped when looking for the function that asked for data
+_SKIP_MODULES = (
+    "upstream_viz_lib.common.otp",
+    "upstream_viz_lib.common.query_metrics",
+    "upstream_viz_lib.common.single_flight",
+    "upstream_viz_lib.common.connector_pool",
+    "upstream_viz_lib.common.bulk_writer",
+    "concurrent.",
+    "threading",
+    "contextlib",
+)
+
+_local = threading.local()
+
+
+def query_fingerprint(normalized_query: str) -> str:
+    return hashlib.sha1(normalized_query.encode("utf-8")).hexdigest()[:12]
+
+
+def find_caller() -> str:
+    """Return 'module.function' of the nearest frame outside of the otp layer."""
+    override = getattr(_local, "caller", None)
+    if override:
+        return override
+
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if not module.startswith(_SKIP_MODULES):
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+@contextmanager
+def called_from(caller: str):
+    """Attribute queries run inside the block (e.g. in worker threads) to caller."""
+    previous = getattr(_local, "caller", None)
+    _local.caller = caller
+    try:
+        yield
+    finally:
+        _local.caller = previous
+
+
+@dataclasses.dataclass
+class QueryRecord:
+    fingerprint: str
+    query: str
+    caller: str
+    cache: str  # hit, miss, coalesced, bypass, stream
+    started_at: float
+    first_byte_s: Optional[float] = None  # time until the job result is ready for download
+    total_s: float = 0.0
+    rows: int = 0
+    columns: int = 0
+    bytes: int = 0  # shallow memory usage of the result
+    reused_connector: Optional[bool] = None  # None if no connector was taken, e.g. cache hit
+    error: Optional[str] = None
+
+
+class QueryTimer:
+    def __init__(self, registry: "QueryMetrics", normalized_query: str, cache: str):
+        self.registry = registry
+        self.record = QueryRecord(
+            fingerprint=query_fingerprint(normalized_query),
+            query=normalized_query[:QUERY_SAMPLE_LENGTH],
+            caller=find_caller(),
+            cache=cache,
+            started_at=time.time(),
+        )
+        self._start = time.perf_counter()
+
+    def mark_first_byte(self):
+        self.record.first_byte_s = time.perf_counter() - self._start
+
+    def mark_connector(self, reused: bool):
+        self.record.reused_connector = reused
+
+    def finish(
+        self,
+        df: Optional[pd.DataFrame] = None,
+        error: Optional[BaseException] = None,
+        rows: int = 0,
+        columns: int = 0,
+        nbytes: int = 0,
+    ) -> QueryRecord:
+        record = self.record
+        record.total_s = time.perf_counter() - self._start
+        if df is not None:
+            rows, columns = df.shape
+            nbytes = int(df.memory_usage(index=False).sum())
+        record.rows, record.columns, record.bytes = rows, columns, nbytes
+        if error is not None:
+            record.error = type(error).__name__
+        self.registry.add(record)
+        return record
+
+
+class QueryMetrics:
+    """In-process registry of per-query metrics: last records and totals per query fingerprint."""
+
+    def __init__(self, max_records: int = DEFAULT_MAX_RECORDS):
+        self._records = deque(maxlen=max_records)
+        self._totals: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def start(self, normalized_query: str, cache: str) -> QueryTimer:
+        return QueryTimer(self, normalized_query, cache)
+
+    def add(self, record: QueryRecord):
+        logger.debug(
+            f"Query {record.fingerprint} ({record.cache}) from {record.caller}: "
+            f"{record.total_s:.3f} s, {record.rows} rows, {record.bytes} bytes"
+            + (f", error {record.error}" if record.error else "")
+        )
+        with self._lock:
+            self._records.append(record)
+            totals = self._totals.get(record.fingerprint)
+            if totals is None:
+                totals = self._totals[record.fingerprint] = {
+                    "fingerprint": record.fingerprint,
+                    "query": record.query,
+                    "callers": set(),
+                    "count": 0,
+                    "errors": 0,
+                    "cache_hits": 0,
+                    "reused_connectors": 0,
+                    "seconds": 0.0,
+                    "max_seconds": 0.0,
+                    "rows": 0,
+                    "bytes": 0,
+                }
+            totals["callers"].add(record.caller)
+            totals["count"] += 1
+            totals["errors"] += record.error is not None
+            totals["cache_hits"] += record.cache in ("hit", "coalesced")
+            totals["reused_connectors"] += bool(record.reused_connector)
+            totals["seconds"] += record.total_s
+            totals["max_seconds"] = max(totals["max_seconds"], record.total_s)
+            totals["rows"] += record.rows
+            totals["bytes"] += record.bytes
+
+    def records(self) -> List[QueryRecord]:
+        with self._lock:
+            return list(self._records)
+
+    def summary(self) -> List[dict]:
+        """Totals per query fingerprint, the most time consuming queries first."""
+        with self._lock:
+            totals = [{**t, "callers": sorted(t["callers"])} for t in self._totals.values()]
+        return sorted(totals, key=lambda t: t["seconds"], reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self._totals.clear()
+
+    def to_json(self, with_records: bool = False) -> str:
+        dump = {"summary": self.summary()}
+        if with_records:
+            dump["records"] = [dataclasses.asdict(r) for r in self.records()]
+        return json.dumps(dump, ensure_ascii=False)
+
+    def to_prometheus(self) -> str:
+        """Totals per query fingerprint in Prometheus text exposition format."""
+        metrics = [
+            ("otp_query_total", "counter", "Number of queries", "count"),
+            ("otp_query_errors_total", "counter", "Number of failed queries", "errors"),
+            ("otp_query_cache_hits_total", "counter", "Queries answered from local cache", "cache_hits"),
+            ("otp_query_reused_connectors_total", "counter", "Queries run on a reused connector", "reused_connectors"),
+            ("otp_query_seconds_total", "counter", "Total query time", "seconds"),
+            ("otp_query_seconds_max", "gauge", "Maximal query time", "max_seconds"),
+            ("otp_query_rows_total", "counter", "Rows received", "rows"),
+            ("otp_query_bytes_total", "counter", "Approximate bytes received", "bytes"),
+        ]
+        summary = self.summary()
+        lines = []
+        for name, kind, help_text, field in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for totals in summary:
+                labels = f'fingerprint="{totals["fingerprint"]}",caller="{_escape_label(",".join(totals["callers"]))}"'
+                lines.append(f"{name}{{{labels}}} {totals[field]}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = QueryMetrics()
@@ -0,0 +1,83 @@
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+def quote_value(value: Any) -> str:
+    """Escape value to be put inside a double-quoted OTL string."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+class QueryTemplate:
+    """
+    Query template parsed once into literal and token segments.
+
+    Tokens are either given explicitly (`tokens`, full token strings like "__SOURCE__" or "$date$",
+    params are keyed by the same strings, as in otp.render_query) or discovered as
+    token_prefix + word + token_suffix (params are keyed by the word, as in otp.beta_render_query).
+
+    By default every value is escaped with quote_value, so a value can't close an OTL string
+    it is put in. Tokens standing for query parts (sources, filters) must be listed in `raw`.
+    """
+
+    def __init__(
+        self,
+        template: str,
+        tokens: Optional[Iterable[str]] = None,
+        token_prefix: str = "__",
+        token_suffix: str = "__",
+        escape: bool = True,
+        raw: Iterable[str] = (),
+    ):
+        self.template = template
+        self.escape = escape
+        self.raw = frozenset(raw)
+
+        if tokens is not None:
+            tokens = sorted(set(tokens), key=len, reverse=True)
+            pattern = "(" + "|".join(re.escape(t) for t in tokens) + ")" if tokens else None
+        else:
+            pattern = re.escape(token_prefix) + r"(\w+?)" + re.escape(token_suffix)
+
+        # re.split with one group returns [literal, name, literal, name, ..., literal]
+        parts = re.split(pattern, template) if pattern else [template]
+        self.literals: Tuple[str, ...] = tuple(parts[0::2])
+        self.names: Tuple[str, ...] = tuple(parts[1::2])
+        self.required = frozenset(self.names)
+
+    def check_params(self, params: Dict[str, Any]):
+        missed = self.required.difference(params)
+        if missed:
+            raise KeyError(f"""Not enough params for query.
+        Required params: {sorted(self.required)}.
+        Missed params: {sorted(missed)}""")
+
+    def _value(self, name: str, value: Any) -> str:
+        if self.escape and name not in self.raw:
+            return quote_value(value)
+        return str(value)
+
+    def render(self, params: Dict[str, Any]) -> str:
+        self.check_params(params)
+        values = {name: self._value(name, params[name]) for name in self.required}
+        parts = [self.literals[0]]
+        for name, literal in zip(self.names, self.literals[1:]):
+            parts.append(values[name])
+            parts.append(literal)
+        return "".join(parts)
+
+    def render_many(self, params_list: Iterable[Dict[str, Any]]) -> List[str]:
+        return [self.render(params) for params in params_list]
+
+
+@lru_cache(maxsize=256)
+def compile_template(
+    template: str,
+    tokens: Optional[Tuple[str, ...]] = None,
+    token_prefix: str = "__",
+    token_suffix: str = "__",
+    escape: bool = True,
+    raw: Tuple[str, ...] = (),
+) -> QueryTemplate:
+    """Return cached QueryTemplate for the same arguments."""
+    return QueryTemplate(template, tokens, token_prefix, token_suffix, escape, raw)
@@ -1,8 +1,10 @@
 import locale
 import os
+import threading
 import yaml
 
 from pathlib import Path
+from types import MappingProxyType
 
 from enum import Enum
 
@@ -28,9 +30,52 @@ else:
     default_data_config_yaml_path = base_src_dir / 'get_data.yaml'
 
 
+# resolved path -> (file mtime, parsed config)
+_conf_cache = {}
+_conf_cache_lock = threading.Lock()
+
+
+def freeze(value):
+    """Return read-only view of parsed yaml: dicts become mappingproxy, lists become tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def unfreeze(value):
+    """Return mutable copy of config returned by get_conf"""
+    if isinstance(value, MappingProxyType):
+        return {k: unfreeze(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [unfreeze(v) for v in value]
+    return value
+
+
 def get_conf(file_path=default_config_yaml_path):
-    with open(file_path, "r", encoding='utf-8') as f:
-        return yaml.safe_load(f)
+    """
+    Return read-only config parsed from yaml file.
+    File is parsed again only when its modification time changes,
+    so edits are picked up without restart.
+    """
+    path = os.path.abspath(file_path)
+    mtime = os.stat(path).st_mtime_ns
+    cached = _conf_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with _conf_cache_lock:
+        with open(path, "r", encoding='utf-8') as f:
+            conf = freeze(yaml.safe_load(f))
+        _conf_cache[path] = (mtime, conf)
+    return conf
+
+
+def reload_conf():
+    """Drop parsed configs, next get_conf call reads files again"""
+    with _conf_cache_lock:
+        _conf_cache.clear()
 
 
 def get_data_conf(file_path=default_data_config_yaml_path):
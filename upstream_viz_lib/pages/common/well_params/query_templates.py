@@ -20,6 +20,12 @@ WELL_STATES = """
 | __SOURCE__
 """
 
+DEPOSIT_WELL_STATES = """
+| __SOURCE__
+| where __deposit="__DEPOSIT__"
+| fields __well_num, well_performance_history, well_condition
+"""
+
 # pump_query = f""" | {get_data_conf["well"]["pump"]}
 #         | search __well_num="{selected_well}"
 #         """
@@ -4,9 +4,10 @@ from pathlib import Path
 import upstream_viz_lib.config
 import pandas as pd
 from upstream_viz_lib.common import otp, styler
+from upstream_viz_lib.common.query_template import compile_template
 from datetime import date, timedelta
 
-from .query_templates import QUERY_METRICS, WELL_STATES, PUMP_PROPS, DATA_QUERY
+from .query_templates import QUERY_METRICS, DEPOSIT_WELL_STATES, PUMP_PROPS, DATA_QUERY
 
 get_data_conf = upstream_viz_lib.config.get_data_conf()
 
@@ -42,13 +43,12 @@ def get_metrics_dict(deposit: str, date_range: Optional[Tuple[date, date]] = Non
 
 
 def get_well_states(deposit: str) -> dict:
-    query = otp.beta_render_query(
-        WELL_STATES,
-        {"SOURCE": get_data_conf["well"]["states"]}
+    query = compile_template(DEPOSIT_WELL_STATES, raw=("SOURCE",)).render(
+        {"SOURCE": get_data_conf["well"]["states"], "DEPOSIT": deposit}
     )
     df_well_states = otp.get_data(query)
     well_states = {}
-    for row in df_well_states.query(f"""__deposit == "{deposit}" """).to_dict(orient="records"):
+    for row in df_well_states.to_dict(orient="records"):
         well_num = row["__well_num"]
         well_type = row["well_performance_history"]
         well_state = row["well_condition"]
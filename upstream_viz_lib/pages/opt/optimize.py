@@ -1,10 +1,15 @@
 import numpy as np
 import pandas as pd
 from pandas import DataFrame
-import glob
 import os
+from functools import partial
 from upstream_viz_lib.config import get_conf, with_locale, get_data_folder
 from upstream_viz_lib.common import otp, styler, logger
+from upstream_viz_lib.common.df_cache import frame_digest
+from upstream_viz_lib.common.economics import fcf_columns
+from upstream_viz_lib.pages.opt.variant_store import get_variant_store, read_variant
+from upstream_viz_lib.pages.pipe.dns_load_store import critical_load_pct
+from upstream_viz_lib.pages.pipe.pipeline_production import beautify_result_df
 import pdb
 
 from ksolver.io.calculate_DF import (
@@ -18,38 +23,19 @@ from upstream.potentials.Economics import Economics
 
 data_folder = get_data_folder()
 
+# columns of precomputed variants replaced by initial calculation values
+VARIANT_INIT_COLS = [
+    "FCF_init",
+    "freq_init",
+    "model_init",
+    "Q_init",
+    "Qn_init",
+    "shtr_oil_debit",
+    "density_calc",
+    "URE",
+    "predict_mode_str",
+]
 
-def beautify_result_df(df):
-    def swap_start_end(row):
-        if not row["startIsSource"] and row["X_kg_sec"] < 0:
-            return row["node_name_end"], row["node_name_start"]
-        else:
-            return row["node_name_start"], row["node_name_end"]
-
-    def make_positive(row, colname):
-        return row[colname] if row["startIsSource"] else abs(row[colname])
-
-    def make_flow_positive(row):
-        return make_positive(row, "X_kg_sec")
-
-    def make_velocity_positive(row):
-        return make_positive(row, "velocity_m_sec")
-
-    def convert_flow_to_m3_day(row):
-        density = (
-            row["density_calc"] * 1000
-            if "density_calc" in row
-            else row["res_liquid_density_kg_m3"]
-        )
-        return row["X_kg_sec"] * 86400 / density
-
-    df[["node_name_start", "node_name_end"]] = df.apply(
-        swap_start_end, axis=1, result_type="expand"
-    )
-    df["X_kg_sec"] = df.apply(make_flow_positive, axis=1)
-    df["X_m3_day"] = df.apply(convert_flow_to_m3_day, axis=1)
-    df["velocity_m_sec"] = df.apply(make_velocity_positive, axis=1)
-    return df
 
 def calculate_fcf(
     row,
@@ -70,24 +56,30 @@ def calculate_fcf(
 
 
 def get_dns_load_pct(q: float, _df_dns_load: pd.DataFrame) -> (float, str):
-    idxmin = _df_dns_load["prod"].idxmin()
-    min_row = _df_dns_load.iloc[[idxmin]].to_dict(orient="records")[0]
-    return 100 * q / min_row["prod"], min_row["device_type"]
+    """q may be an array of flow rates, then an array of load percents is returned"""
+    return critical_load_pct(q, _df_dns_load)
 
 
-def run_solver(df):
-    G, calc_df, df_to_graph_edges_mapping = make_oilpipe_schema_from_OT_dataset(
-        df, folder=data_folder
-    )
+def solve_graph(G) -> bool:
+    """solves schema graph inplace, returns whether solution converged and is valid"""
     solver = HE2_Solver(G)
     solver.push_result_to_log = True
     solver.solve(it_limit=500, threshold=7.5)
     if not solver.op_result.success:
-        return
+        return False
 
     vld = check_solution(G)
     if (vld.negative_P > 0) or (vld.misdirected_flow > 0) or (vld.bad_directions > 0):
         logger.logger.warning(vld)
+        return False
+    return True
+
+
+def run_solver(df):
+    G, calc_df, df_to_graph_edges_mapping = make_oilpipe_schema_from_OT_dataset(
+        df, folder=data_folder
+    )
+    if not solve_graph(G):
         return
 
     calc_df = put_result_to_dataframe(G, calc_df, df_to_graph_edges_mapping)
@@ -98,14 +90,59 @@ def get_random_params(df_params) -> dict:
     return df_params.groupby("wellNum").sample(1).set_index("wellNum").T.to_dict()
 
 
+def plans_frame(plans) -> pd.DataFrame:
+    """
+    Args:
+        plans (List[Dict]): candidates as returned by get_random_params, wellNum -> {"freq": ..., "model": ...}
+
+    Returns:
+        DataFrame: candidate, wellNum, freq, model rows indexed by (candidate, wellNum)
+    """
+    rows = [
+        (candidate, well_num, params["freq"], params["model"])
+        for candidate, plan in enumerate(plans)
+        for well_num, params in plan.items()
+    ]
+    df = pd.DataFrame(rows, columns=["candidate", "wellNum", "freq", "model"])
+    return df.set_index(["candidate", "wellNum"], drop=False)
+
+
+def apply_plans(df_opt, plans, stacked=False):
+    """
+    applies frequency and model of every candidate to df_opt with one indexed join
+
+    Args:
+        df_opt (DataFrame): optimized scheme, is not changed
+        plans (List[Dict]): candidates, wellNum -> {"freq": ..., "model": ...}, wells absent in df_opt are ignored
+        stacked (bool): return one frame with `candidate` column instead of a frame per candidate
+
+    Returns:
+        List[DataFrame] or DataFrame: candidate frames with df_opt index
+    """
+    n_rows = len(df_opt)
+    choices = plans_frame(plans)
+    candidates = np.repeat(np.arange(len(plans)), n_rows)
+    df = df_opt.iloc[np.tile(np.arange(n_rows), len(plans))]
+
+    positions = choices.index.get_indexer(pd.MultiIndex.from_arrays([candidates, df["wellNum"].to_numpy()]))
+    chosen = positions >= 0
+    columns = {"candidate": candidates}
+    for column, choice_column in (("frequency", "freq"), ("model", "model")):
+        values = pd.Series(choices[choice_column].to_numpy()[positions], index=df.index)
+        columns[column] = values.where(chosen, df[column] if column in df.columns else np.nan)
+    df = df.assign(**columns)
+
+    if stacked:
+        return df
+    return [part.drop(columns="candidate") for _, part in df.groupby("candidate", sort=True)]
+
+
 def mutate_df_opt(df_opt, df_params_choice):
-    for well_num, params in df_params_choice.items():
-        if well_num not in df_opt["wellNum"].values:
-            continue
-        freq = params["freq"]
-        model = params["model"]
-        df_opt.loc[(df_opt["wellNum"] == well_num), "frequency"] = freq
-        df_opt.loc[(df_opt["wellNum"] == well_num), "model"] = model
+    if not df_params_choice:
+        return df_opt
+    mutated = apply_plans(df_opt, [df_params_choice])[0]
+    df_opt["frequency"] = mutated["frequency"]
+    df_opt["model"] = mutated["model"]
     return df_opt
 
 
@@ -129,17 +166,27 @@ def get_oil_debit(row):
     return oil_density * q * oil_volume_rate
 
 
+def calculate_fcf_columns(
+    df,
+    params,
+    q_col="shtr_debit",
+    qn_col="shtr_oil_debit",
+    density_col="density_calc",
+    ure_col="URE",
+):
+    """same values as calculate_fcf for every row of df, as numpy array"""
+    return fcf_columns(df[q_col], df[density_col], df[qn_col], df[ure_col], params)
+
+
 def add_new_fcf(df, _params):
-    df["Qn_new"] = df.apply(lambda row: get_oil_debit(row), axis=1)
+    # get_oil_debit is plain arithmetic, so it is evaluated on whole columns
+    df["Qn_new"] = get_oil_debit(df)
     df["URE_new"] = (
         24 * df["res_pump_power_watt"] / (1000 * df["X_m3_day"] * df["density_calc"])
     )
     df["URE_new"] = df["URE_new"].fillna(df["URE"])
-    df["FCF_new"] = df.apply(
-        lambda x: calculate_fcf(
-            x, _params, q_col="X_m3_day", qn_col="Qn_new", ure_col="URE_new"
-        ),
-        axis=1,
+    df["FCF_new"] = calculate_fcf_columns(
+        df, _params, q_col="X_m3_day", qn_col="Qn_new", ure_col="URE_new"
     )
     return df
 
@@ -254,51 +301,79 @@ def get_count_of_calculated_variants(df_params):
     var_cnt = var_cnt if var_cnt > 0 else 9223372036854775806
     return var_cnt
 
-def get_best_fcf_df(selected_dns, df_opt, params):
+def make_variant_df(result_df, df_init, params):
+    """
+    Args:
+        result_df (DataFrame): precomputed optimization variant
+        df_init (DataFrame): wellNum and VARIANT_INIT_COLS of initial calculation
+        params (dict): economic parameters
+
+    Returns:
+        DataFrame: beautified variant wells with new FCF
+    """
+    result_df = result_df.drop(columns=[col for col in VARIANT_INIT_COLS if col in result_df.columns])
+    result_df = result_df.merge(df_init, how="left", on="wellNum")
+    wells_mask = result_df["juncType"] == "wellpump"
+    pipes_q_mask = (result_df["juncType"] == "pipe") & (
+        result_df["startKind"] == "Q"
+    )
+    result_wells_mask = wells_mask | pipes_q_mask
+    pretty_df = beautify_result_df(result_df[result_wells_mask])
+    return add_new_fcf(pretty_df, params)
+
+
+def variant_fcf(path, df_init, params):
+    """
+    Returns:
+        float: FCF sum of variant stored at path, NaN if variant can't be evaluated
+    """
+    try:
+        return make_variant_df(read_variant(path), df_init, params)["FCF_new"].sum()
+    except Exception as err:
+        logger.logger.error(f"Variant {path} is not evaluated: {err}")
+        return np.nan
+
+
+def get_top_fcf_variants(selected_dns, df_opt, params, k=1, max_workers=None):
     """
-    upstream-viz  pages/opt/optimize.py 283
     Args:
         selected_dns (str):
         df_opt (DataFrame): 
+        params (dict): economic parameters
+        k (int): number of variants to return
 
     Returns:
-        DataFrame: new sorted dataframe 
+        List[Tuple[str, float, DataFrame]]: variant name, FCF sum and variant dataframe, best first
     """
     dns_folder = f"dns{selected_dns[-1]}"
-    csv_files = glob.glob(os.path.join(data_folder, "opt", dns_folder, "*.csv"))
-    fcfs = []
+    store = get_variant_store(os.path.join(data_folder, "opt", dns_folder))
     df_init_calc = run_solver_and_filter_and_beautify(df_opt, params)
-    for f in csv_files:
-        result_df = pd.read_csv(f, dtype={"wellNum": str})
-
-        cols_to_drop = [
-            "FCF_init",
-            "freq_init",
-            "model_init",
-            "Q_init",
-            "Qn_init",
-            "shtr_oil_debit",
-            "density_calc",
-            "URE",
-            "predict_mode_str",
-        ]
-        for col in cols_to_drop:
-            if col in result_df.columns:
-                result_df = result_df.drop(col, axis=1)
-        result_df = result_df.merge(
-            df_init_calc[["wellNum"] + cols_to_drop], how="left", on="wellNum"
-        )
-        wells_mask = result_df["juncType"] == "wellpump"
-        pipes_q_mask = (result_df["juncType"] == "pipe") & (
-            result_df["startKind"] == "Q"
-        )
-        result_wells_mask = wells_mask | pipes_q_mask
-        try:
-            pretty_df = beautify_result_df(result_df[result_wells_mask])
-            pretty_df = add_new_fcf(pretty_df, params)
-            fcfs.append((pretty_df, pretty_df["FCF_new"].sum()))
-        except Exception as _:
-            logger.logger.error(result_df)
-        
-        best_df, _ = max(fcfs, key=lambda x: x[-1])
-        return best_df
\ No newline at end of file
+    df_init = df_init_calc[["wellNum"] + VARIANT_INIT_COLS]
+
+    ranking = store.scan(
+        partial(variant_fcf, df_init=df_init, params=params),
+        context_key=frame_digest(df_init, params),
+        max_workers=max_workers,
+    )
+    return [
+        (name, fcf, make_variant_df(store.read(name), df_init, params))
+        for name, fcf in ranking.head(k).itertuples(index=False)
+    ]
+
+
+def get_best_fcf_df(selected_dns, df_opt, params):
+    """
+    upstream-viz  pages/opt/optimize.py 283
+    Args:
+        selected_dns (str):
+        df_opt (DataFrame): 
+
+    Returns:
+        DataFrame: variant with the largest FCF sum, None if there are no variants
+    """
+    top = get_top_fcf_variants(selected_dns, df_opt, params, k=1)
+    if not top:
+        logger.logger.warning(f"No optimization variants evaluated for {selected_dns}")
+        return None
+    _, _, best_df = top[0]
+    return best_df
@@ -0,0 +1,158 @@
+"""
+Schema graph built once per DNS and reused across optimizer candidates.
+"""
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from upstream_viz_lib.common.logger import logger
+from upstream_viz_lib.pages.opt import optimize
+
+CANDIDATE_COLS = ["frequency", "model"]
+VERIFY_CANDIDATES = 3
+RESULT_RTOL = 1e-6
+
+Edge = Tuple[Hashable, Hashable]
+WellOption = Tuple[str, object, object]  # wellNum, frequency, model
+
+
+def mapping_edges(value) -> List[Edge]:
+    """graph edges of one dataframe row in df_to_graph_edges_mapping: a single edge or a list of edges"""
+    if isinstance(value, tuple) and len(value) == 2 and not isinstance(value[0], tuple):
+        return [value]
+    return list(value)
+
+
+def well_option(well, frequency, model) -> WellOption:
+    return (well, None if pd.isna(frequency) else frequency, None if pd.isna(model) else model)
+
+
+def results_differ(patched: Optional[pd.DataFrame], cold: Optional[pd.DataFrame]) -> List[str]:
+    """columns where patched and cold solver results differ, ["<solved>"] if only one of them is solved"""
+    if patched is None or cold is None:
+        return [] if patched is None and cold is None else ["<solved>"]
+    if not patched.index.equals(cold.index):
+        return ["<index>"]
+    differ = sorted(set(patched.columns) ^ set(cold.columns))
+    for col in cold.columns.intersection(patched.columns):
+        a, b = patched[col], cold[col]
+        if pd.api.types.is_numeric_dtype(a) and pd.api.types.is_numeric_dtype(b):
+            same = np.allclose(a.to_numpy(dtype=float), b.to_numpy(dtype=float), rtol=RESULT_RTOL, equal_nan=True)
+        else:
+            same = a.astype(object).where(a.notna(), None).equals(b.astype(object).where(b.notna(), None))
+        if not same:
+            differ.append(col)
+    return differ
+
+
+class PreparedSchema:
+    """
+    Schema graph of df_opt, reused for candidates which differ from df_opt only in well
+    `frequency` and `model`.
+
+    Edge objects of a well depend only on the well's own rows, so they are built once per
+    (wellNum, frequency, model) and kept in a library. A candidate is applied by putting library
+    objects onto the edges of changed wells before HE2_Solver.solve. A candidate with an option not
+    in the library is built in full once (make_oilpipe_schema_from_OT_dataset), its well objects
+    are added to the library, so later candidates with these options are patched.
+
+    Moved edge objects must not keep state of the graph they were built for, and calc_df columns other
+    than `frequency`/`model` must not depend on the candidate. Both are checked: the first `verify`
+    patched candidates are also solved cold and compared; on a difference patching is disabled and
+    every later candidate is solved cold.
+    """
+
+    def __init__(self, df_opt: pd.DataFrame, folder: Optional[str] = None, verify: int = VERIFY_CANDIDATES):
+        self.folder = folder or optimize.data_folder
+        self.verify = verify
+        self.patching = True
+        self.base = df_opt.drop_duplicates("wellNum").set_index("wellNum")[CANDIDATE_COLS]
+        self.graph, self.calc_df, self.mapping = optimize.make_oilpipe_schema_from_OT_dataset(
+            df_opt, folder=self.folder
+        )
+        self.well_edges: Dict[str, List[Edge]] = {
+            well: [edge for index in rows for edge in mapping_edges(self.mapping[index])]
+            for well, rows in self.calc_df.groupby("wellNum").groups.items()
+            if all(index in self.mapping for index in rows)
+        }
+        self.library: Dict[WellOption, Dict[Edge, object]] = {}
+        self.current: Dict[str, WellOption] = {}
+        for well, row in self.base.iterrows():
+            if well in self.well_edges:
+                option = well_option(well, row["frequency"], row["model"])
+                self._harvest(self.graph, option)
+                self.current[well] = option
+        self.stats = {"built": 1, "patched": 0, "verified": 0}
+
+    def _harvest(self, graph, option: WellOption):
+        edges = self.well_edges.get(option[0])
+        if edges is not None:
+            self.library[option] = {edge: graph.edges[edge]["obj"] for edge in edges}
+
+    def candidate_options(self, df: pd.DataFrame) -> List[WellOption]:
+        """options of wells whose frequency or model in df differ from the schema state"""
+        candidate = df.drop_duplicates("wellNum").set_index("wellNum")[CANDIDATE_COLS]
+        options = [
+            well_option(well, row["frequency"], row["model"])
+            for well, row in candidate.iterrows() if well in self.current
+        ]
+        return [option for option in options if self.current[option[0]] != option]
+
+    def _build(self, df: pd.DataFrame, changed: List[WellOption]):
+        graph, calc_df, mapping = optimize.make_oilpipe_schema_from_OT_dataset(df, folder=self.folder)
+        for option in changed:
+            self._harvest(graph, option)
+        self.stats["built"] += 1
+        return graph, calc_df, mapping
+
+    def _patch(self, changed: List[WellOption]):
+        for option in changed:
+            for edge, obj in self.library[option].items():
+                self.graph.edges[edge]["obj"] = obj
+            self.current[option[0]] = option
+        self.stats["patched"] += 1
+
+    def cold_solve(self, df: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """optimize.run_solver on the schema folder"""
+        graph, calc_df, mapping = optimize.make_oilpipe_schema_from_OT_dataset(df, folder=self.folder)
+        self.stats["built"] += 1
+        if not optimize.solve_graph(graph):
+            return None
+        return optimize.put_result_to_dataframe(graph, calc_df, mapping)
+
+    def solve(self, df: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """same result as optimize.run_solver(df) for df = mutate_df_opt(df_opt.copy(), ...)"""
+        if not self.patching:
+            return self.cold_solve(df)
+        result, patched = self._solve_patched(df)
+        if patched and self.stats["verified"] < self.verify:
+            self.stats["verified"] += 1
+            cold = self.cold_solve(df)
+            differ = results_differ(result, cold)
+            if differ:
+                logger.warning(f"Patched schema differs from cold solve in {differ}, patching is disabled")
+                self.patching = False
+                return cold
+        return result
+
+    def _solve_patched(self, df: pd.DataFrame) -> Tuple[Optional[pd.DataFrame], bool]:
+        """result and whether it is solved on the patched graph"""
+        changed = self.candidate_options(df)
+        if any(option not in self.library for option in changed):
+            logger.debug(f"Schema is built for {len(changed)} changed wells")
+            graph, calc_df, mapping = self._build(df, changed)
+            if not optimize.solve_graph(graph):
+                return None, False
+            return optimize.put_result_to_dataframe(graph, calc_df, mapping), False
+
+        self._patch(changed)
+        if not optimize.solve_graph(self.graph):
+            return None, True
+        result = optimize.put_result_to_dataframe(self.graph, self.calc_df.copy(), self.mapping)
+        state = pd.DataFrame(list(self.current.values()), columns=["wellNum"] + CANDIDATE_COLS).set_index("wellNum")
+        for col in CANDIDATE_COLS:
+            if col in result.columns:
+                values = result["wellNum"].map(state[col])
+                result[col] = values.where(result["wellNum"].isin(state.index), result[col])
+        return result, True
@@ -0,0 +1,226 @@
+"""
+Genetic search of ESP frequency/model plans for the opt page.
+
+A plan assigns every optimized well one row of df_params (freq, model). Plans are solved with
+optimize.run_solver in a process pool, every solved plan is memoized, plans exceeding the DNS load
+limit are ranked below all plans within it.
+"""
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from upstream_viz_lib import config
+from upstream_viz_lib.common.logger import logger
+from upstream_viz_lib.pages.opt import optimize
+from upstream_viz_lib.pages.opt.prepared_schema import PreparedSchema
+
+Plan = Tuple[int, ...]  # index of option for every well
+
+MAX_STALLED_GENERATIONS = 20
+
+_worker_context = None
+
+
+@dataclass
+class Evaluation:
+    fcf: float
+    dns_load_pct: float
+    feasible: bool
+
+    @property
+    def fitness(self) -> float:
+        if np.isnan(self.fcf):
+            return -np.inf
+        return self.fcf if self.feasible else self.fcf - 1e12
+
+
+@dataclass
+class SearchResult:
+    plan: Dict[str, dict]  # wellNum -> {"freq": ..., "model": ...}
+    fcf: float
+    dns_load_pct: float
+    feasible: bool
+    evaluations: int
+    seconds: float
+    best_df: Optional[pd.DataFrame] = None
+    history: List[float] = field(default_factory=list)  # best fitness after every generation
+
+
+class SearchContext:
+    """Data every evaluation needs, sent once to every worker process."""
+
+    def __init__(self, df_opt, df_params, econ_params, selected_dns, df_dns_load, dns_limit_pct, reuse_schema=True):
+        self.df_opt = df_opt
+        self.reuse_schema = reuse_schema
+        self._schema = None
+        self.econ_params = econ_params
+        self.selected_dns = selected_dns
+        self.df_dns_load = df_dns_load
+        self.dns_limit_pct = dns_limit_pct
+
+        opt_wells = set(df_opt["wellNum"])
+        options_by_well = {
+            well: group[["freq", "model"]].to_dict(orient="records")
+            for well, group in df_params.groupby("wellNum", sort=False)
+        }
+        self.wells: List[str] = [well for well in options_by_well if well in opt_wells]
+        self.options: List[List[dict]] = [options_by_well[well] for well in self.wells]
+
+    def __getstate__(self):
+        # every worker process builds its own PreparedSchema
+        return {**self.__dict__, "_schema": None}
+
+    def plan_params(self, plan: Plan) -> Dict[str, dict]:
+        return {well: self.options[i][choice] for i, (well, choice) in enumerate(zip(self.wells, plan))}
+
+    def current_plan(self) -> Plan:
+        """plan closest to df_opt: current freq and model of the well if it is an option, else the first option"""
+        current = self.df_opt.drop_duplicates("wellNum").set_index("wellNum")
+        plan = []
+        for well, options in zip(self.wells, self.options):
+            row = current.loc[well]
+            matches = [i for i, o in enumerate(options) if o["freq"] == row.get("frequency") and o["model"] == row.get("model")]
+            plan.append(matches[0] if matches else 0)
+        return tuple(plan)
+
+    def solve(self, plan: Plan) -> Optional[pd.DataFrame]:
+        df = optimize.mutate_df_opt(self.df_opt.copy(), self.plan_params(plan))
+        if self.reuse_schema:
+            if self._schema is None:
+                self._schema = PreparedSchema(self.df_opt)
+            df_calc = self._schema.solve(df)
+        else:
+            df_calc = optimize.run_solver(df)
+        if df_calc is None:
+            return None
+        return optimize.filter_and_beautify(df_calc, self.econ_params)
+
+    def evaluate(self, plan: Plan) -> Evaluation:
+        try:
+            pretty_df = self.solve(plan)
+        except Exception as err:
+            logger.warning(f"Plan is not solved: {err}")
+            pretty_df = None
+        if pretty_df is None:
+            return Evaluation(np.nan, np.nan, False)
+        dns_load_pct, _ = optimize.get_init_dns_load_and_init_crit_device(
+            pretty_df["X_m3_day"].sum(), self.selected_dns, self.df_dns_load
+        )
+        feasible = self.dns_limit_pct is None or dns_load_pct <= self.dns_limit_pct
+        return Evaluation(pretty_df["FCF_new"].sum(), float(dns_load_pct), feasible)
+
+
+def _init_worker(context: SearchContext):
+    global _worker_context
+    _worker_context = context
+
+
+def _evaluate(plan: Plan) -> Evaluation:
+    return _worker_context.evaluate(plan)
+
+
+def search_plan(
+    df_opt: pd.DataFrame,
+    df_params: pd.DataFrame,
+    econ_params: dict,
+    selected_dns: str,
+    df_dns_load: pd.DataFrame,
+    dns_limit_pct: Optional[float] = 100.0,
+    max_evaluations: int = 500,
+    time_limit: Optional[float] = None,
+    population: int = 16,
+    mutation_rate: Optional[float] = None,
+    max_workers: Optional[int] = None,
+    seed: int = 0,
+    reuse_schema: bool = True,
+) -> SearchResult:
+    """
+    Genetic search of the plan with the largest FCF sum within DNS load limit.
+
+    Args:
+        df_opt (DataFrame): optimized scheme, as for run_solver
+        df_params (DataFrame): allowed wellNum, freq, model combinations
+        econ_params (dict): economic parameters
+        selected_dns (str): DNS name, as for get_init_dns_load_and_init_crit_device
+        df_dns_load (DataFrame): DNS load data, as for get_init_dns_load_and_init_crit_device
+        dns_limit_pct (float): DNS load limit, None - no limit
+        max_evaluations (int): budget of solved plans, memoized plans are not counted
+        time_limit (float): budget in seconds, search stops after the generation exceeding it
+        population (int): plans per generation, elites (1/4) are kept unchanged
+        mutation_rate (float): probability to change option of every well, 1 / number of wells by default
+        max_workers (int): number of processes, `pandarallel.n_cores` config value by default
+        reuse_schema (bool): solve candidates on a PreparedSchema per worker instead of run_solver
+
+    Returns:
+        SearchResult: best plan found, its FCF and DNS load, beautified calculation of the plan
+    """
+    start = time.monotonic()
+    context = SearchContext(df_opt, df_params, econ_params, selected_dns, df_dns_load, dns_limit_pct, reuse_schema)
+    n_wells = len(context.wells)
+    if n_wells == 0:
+        raise ValueError("No wells of df_params in df_opt")
+    rng = random.Random(seed)
+    mutation_rate = mutation_rate or 1 / n_wells
+    n_elites = max(population // 4, 1)
+    max_workers = max_workers or (config.get_conf().get("pandarallel") or {}).get("n_cores")
+
+    def random_plan() -> Plan:
+        return tuple(rng.randrange(len(options)) for options in context.options)
+
+    def mutate(plan: Plan) -> Plan:
+        return tuple(
+            rng.randrange(len(options)) if rng.random() < mutation_rate else choice
+            for choice, options in zip(plan, context.options)
+        )
+
+    def crossover(a: Plan, b: Plan) -> Plan:
+        return tuple(x if rng.random() < 0.5 else y for x, y in zip(a, b))
+
+    def tournament(ranked: List[Plan]) -> Plan:
+        # ranked is sorted best first, so the smallest sampled position wins
+        return ranked[min(rng.sample(range(len(ranked)), min(3, len(ranked))))]
+
+    memo: Dict[Plan, Evaluation] = {}
+    history = []
+    stalled = 0
+    generation = [context.current_plan()] + [random_plan() for _ in range(population - 1)]
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(context,)) as executor:
+        while True:
+            todo = list(dict.fromkeys(plan for plan in generation if plan not in memo))
+            todo = todo[:max(max_evaluations - len(memo), 0)]
+            for plan, evaluation in zip(todo, executor.map(_evaluate, todo)):
+                memo[plan] = evaluation
+
+            ranked = sorted(memo, key=lambda plan: memo[plan].fitness, reverse=True)
+            history.append(memo[ranked[0]].fitness)
+            logger.debug(f"Plan search: {len(memo)} plans solved, best fitness {history[-1]}")
+            if len(memo) >= max_evaluations or (time_limit is not None and time.monotonic() - start > time_limit):
+                break
+            stalled = 0 if todo else stalled + 1
+            if stalled >= MAX_STALLED_GENERATIONS:
+                break  # no new plans are generated, e.g. the whole space is solved
+
+            parents = ranked[:population]
+            generation = ranked[:n_elites]
+            while len(generation) < population:
+                generation.append(mutate(crossover(tournament(parents), tournament(parents))))
+
+    best = ranked[0]
+    best_evaluation = memo[best]
+    best_df = context.solve(best) if np.isfinite(best_evaluation.fitness) else None
+    return SearchResult(
+        plan=context.plan_params(best),
+        fcf=best_evaluation.fcf,
+        dns_load_pct=best_evaluation.dns_load_pct,
+        feasible=best_evaluation.feasible,
+        evaluations=len(memo),
+        seconds=time.monotonic() - start,
+        best_df=best_df,
+        history=history,
+    )
@@ -0,0 +1,204 @@
+import glob
+import hashlib
+import json
+import math
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Union
+
+import pandas as pd
+
+from upstream_viz_lib import config
+from upstream_viz_lib.common.logger import logger
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+CACHE_DIR_NAME = "upstream_viz_variant_store"
+MANIFEST_FILE = "manifest.json"
+FCF_INDEX_FILE = "fcf_index.json"
+MAX_INDEX_CONTEXTS = 16
+VARIANT_DTYPES = {"wellNum": str}
+
+
+def file_signature(path: str) -> List[int]:
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def convert_variant(csv_path: str, target_path: str):
+    """Parse variant csv once and store it in columnar format (parquet, pickle without pyarrow)."""
+    df = pd.read_csv(csv_path, dtype=VARIANT_DTYPES)
+    if target_path.endswith(".parquet"):
+        df.to_parquet(target_path)
+    else:
+        df.to_pickle(target_path)
+
+
+def read_variant(path: str) -> pd.DataFrame:
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+
+def default_cache_dir(source_dir: str) -> str:
+    """
+    Cache directory of source_dir under `opt_variants.cache_dir` config value,
+    or under the system temp directory if it is not set. Never inside source_dir.
+    """
+    cache_root = (config.get_conf().get("opt_variants") or {}).get("cache_dir")
+    cache_root = cache_root or os.path.join(tempfile.gettempdir(), CACHE_DIR_NAME)
+    source_dir = os.path.abspath(source_dir)
+    digest = hashlib.sha1(source_dir.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(cache_root, f"{os.path.basename(source_dir)}-{digest}")
+
+
+def _read_json(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _write_json(path: str, data: dict):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class VariantStore:
+    """
+    Precomputed optimization variants (csv files of one DNS folder) in columnar format.
+
+    Every csv is parsed once and stored in `cache_dir` (see default_cache_dir, source_dir is only read);
+    files are converted again only when their mtime or size change. `scan` evaluates variant FCF
+    in a process pool and keeps per-variant totals in an index keyed by evaluation context
+    (initial calculation and economic params), so repeated requests evaluate only new or changed variants.
+    Failed evaluations (NaN) and files that failed to convert are skipped and retried on the next scan.
+    """
+
+    def __init__(self, source_dir: str, cache_dir: Optional[str] = None, pattern: str = "*.csv"):
+        self.source_dir = source_dir
+        self.cache_dir = cache_dir or default_cache_dir(source_dir)
+        self.pattern = pattern
+        self.extension = ".parquet" if pyarrow is not None else ".pkl"
+        self._lock = threading.Lock()
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.cache_dir, MANIFEST_FILE)
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.cache_dir, FCF_INDEX_FILE)
+
+    def cached_path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, os.path.splitext(name)[0] + self.extension)
+
+    def refresh(self, max_workers: Optional[int] = None) -> Dict[str, Union[list, str]]:
+        """
+        Convert new and changed csv files, drop removed ones.
+
+        Returns {variant name: signature}; a file that failed to convert maps to its error message
+        instead, is left out of the manifest and converted again on the next refresh.
+        """
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            manifest = _read_json(self.manifest_path)
+            current = {
+                os.path.basename(path): file_signature(path)
+                for path in sorted(glob.glob(os.path.join(self.source_dir, self.pattern)))
+            }
+            changed = [
+                name for name, signature in current.items()
+                if manifest.get(name) != signature or not os.path.exists(self.cached_path(name))
+            ]
+            if changed:
+                logger.info(f"Converting {len(changed)} optimization variants in {self.source_dir}")
+                sources = [os.path.join(self.source_dir, name) for name in changed]
+                targets = [self.cached_path(name) for name in changed]
+                with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    futures = {
+                        name: executor.submit(convert_variant, source, target)
+                        for name, source, target in zip(changed, sources, targets)
+                    }
+                    for name, future in futures.items():
+                        try:
+                            future.result()
+                        except Exception as e:
+                            logger.error(f"Failed to convert optimization variant {name}: {e!r}")
+                            current[name] = repr(e)
+                            try:
+                                os.remove(self.cached_path(name))  # do not read a stale conversion
+                            except FileNotFoundError:
+                                pass
+
+            for name in set(manifest) - set(current):
+                try:
+                    os.remove(self.cached_path(name))
+                except FileNotFoundError:
+                    pass
+            if changed or set(manifest) != set(current):
+                _write_json(self.manifest_path, {
+                    name: signature for name, signature in current.items() if isinstance(signature, list)
+                })
+            return current
+
+    def read(self, name: str) -> pd.DataFrame:
+        return read_variant(self.cached_path(name))
+
+    def scan(
+        self,
+        evaluate: Callable[[str], float],
+        context_key: str,
+        max_workers: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """
+        Total FCF of every variant, sorted descending. Variants failed to evaluate (NaN) are dropped.
+
+        :param evaluate: picklable function (cached variant path) -> total FCF
+        :param context_key: key of everything evaluate depends on besides the variant file
+        """
+        current = {
+            name: signature for name, signature in self.refresh(max_workers).items()
+            if isinstance(signature, list)
+        }
+        with self._lock:
+            index = _read_json(self.index_path)
+        known = index.get(context_key, {})
+
+        todo = [name for name, signature in current.items() if known.get(name, [None])[0] != signature]
+        if todo:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                totals = list(executor.map(evaluate, [self.cached_path(name) for name in todo]))
+            for name, total in zip(todo, totals):
+                if total is None or math.isnan(total):
+                    known.pop(name, None)  # failure may be transient, evaluated again next time
+                else:
+                    known[name] = [current[name], total]
+        logger.debug(f"Variants evaluated: {len(todo)}, taken from index: {len(current) - len(todo)}")
+
+        known = {name: known[name] for name in current if name in known}
+        with self._lock:
+            index = _read_json(self.index_path)
+            index.pop(context_key, None)
+            index[context_key] = known
+            while len(index) > MAX_INDEX_CONTEXTS:
+                index.pop(next(iter(index)))
+            _write_json(self.index_path, index)
+
+        ranking = pd.DataFrame(
+            [(name, total) for name, (_, total) in known.items()], columns=["variant", "fcf"]
+        )
+        return ranking.dropna(subset=["fcf"]).sort_values("fcf", ascending=False, ignore_index=True)
+
+
+def get_variant_store(source_dir: str) -> VariantStore:
+    """Store for source_dir with cache in default_cache_dir(source_dir)."""
+    return VariantStore(source_dir)
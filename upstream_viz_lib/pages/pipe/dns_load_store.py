@@ -0,0 +1,135 @@
+'''
+DNS capacity reference data loaded once per TTL and indexed by DNS address
+'''
+
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from upstream_viz_lib import config
+from upstream_viz_lib.common import otp
+from upstream_viz_lib.common.logger import logger
+
+DEFAULT_TTL = 600
+DNS_DEVICE_TYPE = "ДНС"
+DEVICE_TYPE_NAMES = {
+    "О": "Отстойники нефти",
+    "НГС": "Нефтегазовые сепараторы",
+    "РВС": "Резервуары РВС",
+}
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def dns_address(selected_dns):
+    """address of DNS as in DNS load data, selected_dns is the name from selectbox"""
+    return(selected_dns.lstrip("НС "))
+
+
+def critical_load_pct(q, df_load):
+    """
+    load percent of the device with the least capacity (`prod`) for flow rate(s) q
+
+    Arguments:
+    q: float or np.ndarray - DNS flow rate(s), m3/day
+    df_load: pd.DataFrame - DNS load data with `prod` and `device_type` columns
+
+    Returns:
+    float or np.ndarray - load percent
+    str - critical device type
+    """
+    prod = df_load["prod"].to_numpy(dtype=float)
+    position = np.nanargmin(prod)
+    return(100 * np.asarray(q, dtype=float)[()] / prod[position], df_load["device_type"].iloc[position])
+
+
+class DnsLoadStore:
+    """
+    All DNS load data, loaded with one query and kept `ttl` seconds.
+
+    Device names and `current_load_rate` are computed once per load, rows are indexed
+    by DNS address and device type. Frames returned by `get` are shared and must not be changed,
+    `get_dns_load` returns a new frame.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, loader=None):
+        self.ttl = ttl
+        self.loader = loader or self.load_all
+        self._table = None
+        self._by_address = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def load_all():
+        # imported here: optimize uses critical_load_pct and must not depend on pipe page templates
+        from upstream_viz_lib.pages.pipe import hcalc_dashboard_static as stc2
+
+        query = stc2.QUERY_TEMPLATE_dns_load.replace("__FILTER_IS_WORK__", "where isnotnull(address)")
+        return(otp.get_data(query, ttl=0))
+
+    def _prepare(self, df_load):
+        df_load = df_load.assign(
+            current_load_rate=100 * df_load["current_debit"] / df_load["prod"],
+            device_type=df_load["device_type"].replace(DEVICE_TYPE_NAMES),
+        )
+        self._table = df_load.set_index(["address", "device_type"], drop=False).sort_index()
+        self._by_address = {
+            address: group for address, group in self._table.groupby(level="address", sort=False)
+        }
+
+    def table(self):
+        """all DNS load data indexed by address and device type, reloaded when expired"""
+        if self._table is None or time.monotonic() - self._loaded_at > self.ttl:
+            with self._lock:
+                if self._table is None or time.monotonic() - self._loaded_at > self.ttl:
+                    self._prepare(self.loader())
+                    self._loaded_at = time.monotonic()
+                    logger.debug(f"DNS load data loaded: {len(self._table)} rows")
+        return(self._table)
+
+    def invalidate(self):
+        with self._lock:
+            self._table = None
+
+    def get(self, selected_dns, only_working=False):
+        """DNS load data of one DNS, shared read-only frame"""
+        self.table()
+        df_load = self._by_address.get(dns_address(selected_dns), self._table.iloc[:0])
+        if only_working:
+            df_load = df_load[(df_load["is_work"] == 1) | (df_load["device_type"] == DNS_DEVICE_TYPE)]
+        return(df_load)
+
+    def load_rates(self, q, selected_dns, only_working=False):
+        """
+        load percent of every device of DNS for every flow rate
+
+        Arguments:
+        q: array-like - DNS flow rates, m3/day
+
+        Returns:
+        pd.DataFrame - rows are flow rates, columns are devices (address, device_type)
+        """
+        df_load = self.get(selected_dns, only_working)
+        q = np.asarray(q, dtype=float).reshape(-1, 1)
+        rates = 100 * q / df_load["prod"].to_numpy(dtype=float)
+        return(pd.DataFrame(rates, columns=df_load.index))
+
+    def get_dns_load(self, q, selected_dns, only_working=False):
+        """same result as hcalc_dashboard_getdata.get_dns_load"""
+        df_load = self.get(selected_dns, only_working).reset_index(drop=True)
+        return(df_load.assign(predict_load_rate=100 * q / df_load["prod"]))
+
+
+def get_dns_load_store():
+    """process-wide DnsLoadStore, `dns_load.ttl` config value is used as TTL"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                ttl = (config.get_conf().get("dns_load") or {}).get("ttl", DEFAULT_TTL)
+                _store = DnsLoadStore(ttl=ttl)
+    return(_store)
@@ -4,6 +4,8 @@
 
 # import locale
 
+import numpy as np
+
 from upstream_viz_lib.pages.pipe import pipeline_production as ppr
 from upstream_viz_lib.pages.pipe import hcalc_dashboard_getdata as dta
 
@@ -24,37 +26,18 @@ def output_grid(df):
     returns dataframe to show as aggrid
     based on `results.show_grid`
     """
-    mdf = df.copy()
-    mdf = ppr.beautify_result_df(mdf)
-    return(mdf)
+    return(df.assign(**ppr.beautify_result_columns(df)))
 
 
-def output_dns_load(df, selected_dns, getDnsLoadFn=dta.get_dns_load, only_working=True):
+def dns_load_metrics(result_df, selected_dns, getDnsLoadFn=dta.get_dns_load, only_working=True):
     """
-    based on `results.show_dns_load`
-
-    Arguments:
-    df: pd.DataFrame - results of hydraulic calculation
-    selected_dns: str - selected pipeline subsystem
-    getDnsLoadFn: types.FunctionType - function to compute DNS load, accepts arguments
-                                                q: float - DNS flow rate, m3/day
-                                                selected_dns: str
-                                                only_working: bool, default False
-    only_working: bool
-
-    Returns:
-        1: dataframe with object loads
-        2: flow rate metric (scalar)
-        3: debit metric (scalar)
-        4: load metric (scalar)
+    same as `output_dns_load` for already beautified results, result_df is not changed
     """
-    df = df.copy()
-    result_df = ppr.beautify_result_df(df)
-    result_df["qn_m3_day"] = result_df.apply(
-        lambda row: (1 - row["res_watercut_percent"] / 100) * row["X_m3_day"], axis=1
-    )
-    result_dns_q = result_df[result_df["endIsOutlet"] == 1]["X_m3_day"].sum()
-    result_dns_qn = result_df[result_df["endIsOutlet"] == 1]["qn_m3_day"].sum()
+    outlets = (result_df["endIsOutlet"] == 1).to_numpy()
+    q_m3_day = result_df["X_m3_day"].to_numpy()[outlets]
+    watercut = result_df["res_watercut_percent"].to_numpy(dtype=float)[outlets]
+    result_dns_q = np.nansum(q_m3_day)
+    result_dns_qn = np.nansum((1 - watercut / 100) * q_m3_day)
     df_load = getDnsLoadFn(q=result_dns_q,
                            selected_dns=selected_dns,
                            only_working=only_working)
@@ -79,6 +62,28 @@ def output_dns_load(df, selected_dns, getDnsLoadFn=dta.get_dns_load, only_workin
     return(df_dns_load, metric_q, metric_qn, metric_load)
 
 
+def output_dns_load(df, selected_dns, getDnsLoadFn=dta.get_dns_load, only_working=True):
+    """
+    based on `results.show_dns_load`
+
+    Arguments:
+    df: pd.DataFrame - results of hydraulic calculation
+    selected_dns: str - selected pipeline subsystem
+    getDnsLoadFn: types.FunctionType - function to compute DNS load, accepts arguments
+                                                q: float - DNS flow rate, m3/day
+                                                selected_dns: str
+                                                only_working: bool, default False
+    only_working: bool
+
+    Returns:
+        1: dataframe with object loads
+        2: flow rate metric (scalar)
+        3: debit metric (scalar)
+        4: load metric (scalar)
+    """
+    return(dns_load_metrics(output_grid(df), selected_dns, getDnsLoadFn, only_working))
+
+
 def output_results(df, options, getDnsLoadFn=dta.get_dns_load):
     """
     returns calculation results:
@@ -88,9 +93,11 @@ def output_results(df, options, getDnsLoadFn=dta.get_dns_load):
         4: metric for flow rate
         5: metric for debit
         6: metric for load
+
+    Results are beautified once, 1 and 2 share data with each other and must be treated as read-only.
     """
     wells_df = df[df["juncType"] == "oilwell"]
-    draw_df = df[~df["node_id_start"].str.contains("PAD")].copy(deep=True)
+    draw_df = df.take(np.flatnonzero(~df["node_id_start"].str.contains("PAD").to_numpy(dtype=bool)))
     draw_df.loc[
         draw_df["node_id_start"].isin(wells_df["node_id_end"]), "startIsSource"
     ] = True
@@ -99,12 +106,12 @@ def output_results(df, options, getDnsLoadFn=dta.get_dns_load):
     df_toShow = output_grid(draw_df)
     
     # 2:
-    df_toDraw = draw_df.copy()
+    df_toDraw = draw_df
 
     # 3,4,5,6:
-    df_dnsLoad, metric_q, metric_qn, metric_load = output_dns_load(df=draw_df,
-                                                                   selected_dns=options["selected_dns"].lstrip("НС "),
-                                                                   getDnsLoadFn=getDnsLoadFn,
-                                                                   only_working=options["only_working"])
+    df_dnsLoad, metric_q, metric_qn, metric_load = dns_load_metrics(result_df=df_toShow,
+                                                                    selected_dns=options["selected_dns"].lstrip("НС "),
+                                                                    getDnsLoadFn=getDnsLoadFn,
+                                                                    only_working=options["only_working"])
 
     return(df_toShow, df_toDraw, df_dnsLoad, metric_q, metric_qn, metric_load)
\ No newline at end of file
@@ -5,8 +5,30 @@
 from upstream_viz_lib import config
 from upstream_viz_lib.common import otp
 
-from upstream_viz_lib.pages.pipe import pipeline_production_static as stc
-from upstream_viz_lib.pages.pipe import hcalc_dashboard_static as stc2
+from upstream_viz_lib.pages.pipe.dns_load_store import get_dns_load_store
+
+# query templates (pipeline_production_static, hcalc_dashboard_static) are imported in the functions using them,
+# so hcalc_dashboard and get_dns_load do not depend on them, as in dns_load_store
+
+
+def render_hcalc_data_query(field_name, scheme_name, date):
+    from upstream_viz_lib.pages.pipe import pipeline_production_static as stc
+    return otp.render_query(query_template=stc.QUERY_TEMPLATE_calc_data,
+                            query_params={"__SOURCE__": config.get_data_conf()["pipe"]["calc_wells"], # config.get_conf("get_data.yaml")["pipe"]["calc_wells"],
+                                          "__FIELD_NAME__": field_name,
+                                          "__SCHEME_NAME__": scheme_name,
+                                          "__TIME__": date})
+
+
+
+def render_prediction_query(field_name, scheme_name, date):
+    from upstream_viz_lib.pages.pipe import pipeline_production_static as stc
+    return otp.render_query(query_template=stc.QUERY_TEMPLATE_prediction_noModes,
+                            query_params={"__SOURCE__": config.get_data_conf()["pipe"]["pipe_prediction"], # config.get_conf("get_data.yaml")["pipe"]["pipe_prediction"],
+                                          "__FIELD_NAME__": field_name,
+                                          "__SCHEME_NAME__": scheme_name,
+                                          "__TIME__": date})
+
 
 
 def get_hcalc_data(field_name, scheme_name, date):
@@ -21,12 +43,7 @@ def get_hcalc_data(field_name, scheme_name, date):
     Returns:
     pd.DataFrame
     """
-    query = otp.render_query(query_template=stc.QUERY_TEMPLATE_calc_data,
-                             query_params={"__SOURCE__": config.get_data_conf()["pipe"]["calc_wells"], # config.get_conf("get_data.yaml")["pipe"]["calc_wells"],
-                                           "__FIELD_NAME__": field_name,
-                                           "__SCHEME_NAME__": scheme_name,
-                                           "__TIME__": date})
-    dfCalc = otp.get_data(query)
+    dfCalc = otp.get_data(render_hcalc_data_query(field_name, scheme_name, date))
     return(dfCalc)
 
 
@@ -35,44 +52,36 @@ def get_prediction_data(field_name, scheme_name, date):
     """
     
     """
-    query = otp.render_query(query_template=stc.QUERY_TEMPLATE_prediction_noModes,
-                             query_params={"__SOURCE__": config.get_data_conf()["pipe"]["pipe_prediction"], # config.get_conf("get_data.yaml")["pipe"]["pipe_prediction"],
-                                           "__FIELD_NAME__": field_name,
-                                           "__SCHEME_NAME__": scheme_name,
-                                           "__TIME__": date})    
-    dfResult = otp.get_data(query)
+    dfResult = otp.get_data(render_prediction_query(field_name, scheme_name, date))
     return(dfResult)    
 
 
 
+def get_hcalc_and_prediction_data(field_name, scheme_name, date):
+    """
+    returns results of `get_hcalc_data` and `get_prediction_data`,
+    both queries run concurrently
+
+    Returns:
+    Tuple[pd.DataFrame, pd.DataFrame]
+    """
+    dfCalc, dfResult = otp.get_data_many([render_hcalc_data_query(field_name, scheme_name, date),
+                                          render_prediction_query(field_name, scheme_name, date)])
+    return(dfCalc, dfResult)
+
+
+
 def get_dns_load(q: float, selected_dns: str, only_working: bool = False):
     """
-    
+    returns load data of selected DNS devices with load rates for flow rate q,
+    data is taken from process-wide `dns_load_store.DnsLoadStore`
     """
-    is_work_mask = (
-        """where is_work=1 OR device_type="ДНС" """
-        if only_working
-        else "___ # No filter ___ "
-    )
-    query_load = stc2.QUERY_TEMPLATE_dns_load.replace(
-        "__FILTER_IS_WORK__", is_work_mask
-    )
-    df_load = otp.get_data(query_load)
-    df_load = df_load[df_load["address"] == selected_dns.lstrip("НС ")]
-    df_load["current_load_rate"] = 100 * df_load["current_debit"] / df_load["prod"]
-    df_load["predict_load_rate"] = 100 * q / df_load["prod"]
-    df_load["device_type"] = df_load["device_type"].replace(
-        {
-            "О": "Отстойники нефти",
-            "НГС": "Нефтегазовые сепараторы",
-            "РВС": "Резервуары РВС",
-        }
-    )
-    return df_load
+    return get_dns_load_store().get_dns_load(q, selected_dns, only_working)
 
 
 
 def get_field_names():
+    from upstream_viz_lib.pages.pipe import hcalc_dashboard_static as stc2
     query_field_names = otp.render_query(query_template=stc2.QUERY_TEMPLATE_field_names,
                                          query_params={})
     return(otp.get_data(query_field_names))
@@ -80,6 +89,7 @@ def get_field_names():
 
 
 def get_scheme_names(field_name):
+    from upstream_viz_lib.pages.pipe import hcalc_dashboard_static as stc2
     query_scheme_names = otp.render_query(query_template=stc2.QUERY_TEMPLATE_scheme_names,
                                           query_params={"__FIELD_NAME__": field_name})
     return(otp.get_data(query_scheme_names))
@@ -0,0 +1,136 @@
+'''
+Scenario sweep for pipeline hydraulic calculation
+'''
+
+import copy
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from upstream_viz_lib import config
+from upstream_viz_lib.common.logger import logger
+from upstream_viz_lib.pages.pipe import pipeline_production as ppr
+
+SCENARIO_COL = "scenario"
+CONVERGED_COL = "converged"
+
+_worker_df = None
+_worker_data_folder = None
+
+
+##  *  *  *  SCENARIOS  *  *  *
+
+def expand_grid(grid):
+    """
+    builds scenarios as cartesian product of option values
+
+    Arguments:
+    grid: dict - option values to try, e.g.
+        {
+            "eff_diam": [0.8, 0.85, 0.9],
+            "outlets_dict": {"ДНС-1": [5.0, 6.0]},
+            "liquid_properties": {"oil_density_kg_m3": [826, 850]},
+        }
+
+    Returns:
+    List[dict] - overrides, keys are option names, nested options are joined by dot:
+        {"eff_diam": 0.8, "outlets_dict.ДНС-1": 5.0, "liquid_properties.oil_density_kg_m3": 826}
+    """
+    names, values = [], []
+    for section, section_values in grid.items():
+        if isinstance(section_values, dict):
+            for key, key_values in section_values.items():
+                names.append(f"{section}.{key}")
+                values.append(list(key_values))
+        else:
+            names.append(section)
+            values.append(list(section_values))
+    return([dict(zip(names, combination)) for combination in itertools.product(*values)])
+
+
+def apply_overrides(options, overrides):
+    """
+    returns copy of hcalc options with overrides from `expand_grid` applied,
+    liquid properties keep their labels
+    """
+    options = copy.deepcopy(options)
+    for name, value in overrides.items():
+        section, _, key = name.partition(".")
+        if not key:
+            options[section] = value
+        elif section == "liquid_properties":
+            _, label = options[section].get(key, (None, key))
+            options[section][key] = (value, label)
+        else:
+            options.setdefault(section, {})[key] = value
+    return(options)
+
+
+##  *  *  *  CALCULATION  *  *  *
+
+def _init_worker(df, data_folder):
+    global _worker_df, _worker_data_folder
+    _worker_df = df
+    _worker_data_folder = data_folder
+
+
+def solve_scenario(options):
+    """
+    solves input data shared with the worker process for given options
+
+    Returns:
+    pd.DataFrame or None - calculation results
+    dict - status: converged, error, seconds
+    """
+    start = time.perf_counter()
+    try:
+        dfResult, g = ppr.run_hcalc(_worker_df, options, _worker_data_folder)
+        converged, report = ppr.validate_solution(g)
+        error = None if converged else report
+    except Exception as err:
+        dfResult, converged, error = None, False, f"{type(err).__name__}: {err}"
+    return(dfResult, {CONVERGED_COL: converged, "error": error, "seconds": time.perf_counter() - start})
+
+
+def get_default_workers():
+    return((config.get_conf().get("pandarallel") or {}).get("n_cores"))
+
+
+def run_scenarios(df, state, data_folder, scenarios, max_workers=None):
+    """
+    performs hydraulic calculation for every scenario in a process pool
+
+    Arguments:
+    df: pd.DataFrame - input data, as for `pipeline_production.get_hcalc_results`
+    state: dict - state with base "options"
+    data_folder: str - location to supplementary data for solver
+    scenarios: dict or List[dict] - grid for `expand_grid` or list of overrides
+    max_workers: int - number of processes, `pandarallel.n_cores` config value by default
+
+    Returns:
+    pd.DataFrame - stacked results of all scenarios with `scenario` number and `converged` flag columns,
+                   failed scenarios have no rows
+    pd.DataFrame - one row per scenario: overrides, converged, error, seconds
+    """
+    if isinstance(scenarios, dict):
+        scenarios = expand_grid(scenarios)
+    options_list = [apply_overrides(state["options"], overrides) for overrides in scenarios]
+    max_workers = max_workers or get_default_workers()
+
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             initializer=_init_worker,
+                             initargs=(df, data_folder)) as executor:
+        solved = list(executor.map(solve_scenario, options_list))
+
+    results, statuses = [], []
+    for number, (overrides, (dfResult, status)) in enumerate(zip(scenarios, solved)):
+        statuses.append({SCENARIO_COL: number, **overrides, **status})
+        if status["error"] is not None:
+            logger.warning(f"Scenario {number} {overrides}: {status['error']}")
+        if dfResult is not None:
+            results.append(dfResult.assign(**{SCENARIO_COL: number, CONVERGED_COL: status[CONVERGED_COL]}))
+
+    dfResults = pd.concat(results, ignore_index=True) if results else pd.DataFrame(columns=[SCENARIO_COL, CONVERGED_COL])
+    return(dfResults, pd.DataFrame(statuses))
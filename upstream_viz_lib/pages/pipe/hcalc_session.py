@@ -0,0 +1,144 @@
+'''
+Session-scoped hydraulic recalculation with warm start
+'''
+
+import time
+
+from ksolver.io.calculate_DF import (
+    make_oilpipe_schema_from_OT_dataset,
+    put_result_to_dataframe,
+)
+from ksolver.solver.HE2_Solver import HE2_Solver
+
+from upstream_viz_lib.common.df_cache import frame_digest
+from upstream_viz_lib.common.logger import logger
+from upstream_viz_lib.pages.pipe import pipeline_production as ppr
+
+SESSION_STATE_KEY = "hcalc_session"
+
+
+class HcalcSession:
+    """
+    Keeps the solved graph of the last calculation.
+
+    When input data and options differ from the previous call only in outlet pressures
+    (`options["outlets_dict"]`), the pressure boundaries of the kept graph are patched and the same
+    HE2_Solver is run again from its last solution instead of building the schema and solving from scratch.
+    Any other change (input data, eff_diam, liquid properties, new outlets) and a warm solve
+    which did not converge lead to a cold calculation.
+    """
+
+    def __init__(self, data_folder, solver_params=None):
+        self.data_folder = data_folder
+        self.solver_params = dict(solver_params or ppr.SOLVER_PARAMS)
+        self.last_mode = None
+        self.stats = {"cold": 0, "warm": 0, "fallback": 0}
+        self.reset()
+
+    def reset(self):
+        self._graph = None
+        self._solver = None
+        self._calc_df = None
+        self._mapping = None
+        self._key = None
+        self._outlets = {}
+        self._outlet_nodes = {}
+
+    @staticmethod
+    def _static_key(df, options):
+        static_options = {k: v for k, v in options.items() if k != "outlets_dict"}
+        try:
+            return(frame_digest(df, static_options))
+        except TypeError:
+            return(None)
+
+    def _solve(self):
+        self._solver.solve(**self.solver_params)
+        if not self._solver.op_result.success:
+            return(False)
+        valid, report = ppr.validate_solution(self._graph)
+        if not valid:
+            logger.warning(report)
+        return(valid)
+
+    def _result(self):
+        calc_df = self._calc_df.copy()
+        if self._outlets and "node_name_end" in calc_df.columns:
+            # input columns of the kept frame must show current outlet pressures, as after a cold fill
+            calc_df["endValue"] = ppr.outlet_end_values(calc_df, self._outlets)
+        return(put_result_to_dataframe(self._graph, calc_df, self._mapping))
+
+    def _cold(self, df, options, key):
+        self.reset()
+        dfFilled = ppr.fill(ppr.clean(df.copy()), options=options)
+        self._graph, self._calc_df, self._mapping = make_oilpipe_schema_from_OT_dataset(
+            dfFilled, folder=self.data_folder
+        )
+        self._solver = HE2_Solver(self._graph)
+        converged = self._solve()
+        result = self._result()
+        if converged:
+            self._key = key
+            self._outlets = dict(options["outlets_dict"])
+            for name in self._outlets:
+                self._outlet_nodes[name] = dfFilled.loc[dfFilled["node_name_end"] == name, "node_id_end"].unique()
+        else:
+            logger.warning("Hydraulic calculation did not converge, result is not kept for warm start")
+            self.reset()
+        self.stats["cold"] += 1
+        self.last_mode = "cold"
+        return(result)
+
+    def _warm(self, outlets):
+        # removed or added outlet changes node kinds, not only values: solved cold
+        if outlets.keys() != self._outlets.keys():
+            return(None)
+        changed = {name: value for name, value in outlets.items() if self._outlets.get(name) != value}
+        if any(name not in self._outlet_nodes for name in changed):
+            return(None)
+        for name, value in changed.items():
+            for node in self._outlet_nodes[name]:
+                self._graph.nodes[node]["obj"].value = float(value)
+        if not self._solve():
+            return(None)
+        self._outlets = dict(outlets)
+        self.stats["warm"] += 1
+        self.last_mode = "warm"
+        return(self._result())
+
+    def calculate(self, df, options):
+        """
+        performs hydraulic calculation, warm if only outlet pressures changed since the last call
+
+        Arguments:
+        df: pd.DataFrame - input data
+        options: dict - calculation options as in state["options"]
+
+        Returns:
+        pd.DataFrame
+        """
+        start = time.perf_counter()
+        key = self._static_key(df, options)
+        result = None
+        if self._graph is not None and key is not None and key == self._key:
+            try:
+                result = self._warm(options["outlets_dict"])
+            except Exception as err:
+                logger.warning(f"Warm hydraulic recalculation failed: {err}")
+            if result is None:
+                self.stats["fallback"] += 1
+        if result is None:
+            result = self._cold(df, options, key)
+        logger.debug(f"Hydraulic calculation ({self.last_mode}) took {time.perf_counter() - start:.2f} s")
+        return(result)
+
+
+def get_hcalc_results_warm(df, state, data_folder):
+    """
+    same as `pipeline_production.get_hcalc_results`, keeps HcalcSession in state for warm recalculation
+    """
+    session = state.get(SESSION_STATE_KEY)
+    if session is None or session.data_folder != data_folder:
+        session = HcalcSession(data_folder)
+        state[SESSION_STATE_KEY] = session
+    return(session.calculate(df, state["options"]))
@@ -2,7 +2,33 @@
 2022-12-06
 '''
 
+import threading
+
+import numpy as np
+
 from ksolver.io.calculate_DF import calculate_DF
+from ksolver.tools.HE2_tools import check_solution
+
+from upstream_viz_lib import config
+from upstream_viz_lib.common.df_cache import DataFrameCache, frame_digest
+from upstream_viz_lib.common.logger import logger
+
+DEFAULT_HCALC_CACHE_MAX_MB = 512
+SOLVER_PARAMS = dict(threshold=4.5)
+
+# input columns used by fill and their dtypes, None - column is required as is
+FILL_SCHEMA = {
+    "node_name_end": None,
+    "productivity": float,
+    "VolumeWater": float,
+    "endIsOutlet": None,  # NaN -> False, other values are kept as they are
+    "node_id_start": str,
+    "node_id_end": str,
+}
+FILL_RENAME = {"__pad_num": "padNum", "__well_num": "wellNum", "d": "D", "s": "S"}
+
+_hcalc_cache = None
+_hcalc_cache_lock = threading.Lock()
 
 
 ##  *  *  *  SUPPLEMENTARY FUNCTIONS  *  *  *
@@ -93,45 +119,53 @@ def collect_state(
 
 
 
+def beautify_result_columns(df):
+    """
+    computes formatted results columns:
+        flow goes from start to end node, so start and end names are swapped
+        for negative flow when start is not a source, flow and velocity are
+        made positive, flow is converted from kg/s to m3/day
+
+    Arguments:
+    df: pd.DataFrame - results table
+
+    Returns:
+    Dict[str, np.ndarray] - node_name_start, node_name_end, X_kg_sec, X_m3_day, velocity_m_sec
+    """
+    start_is_source = df["startIsSource"].astype(bool).to_numpy()
+    x_kg_sec = df["X_kg_sec"].to_numpy(dtype=float)
+    swap = ~start_is_source & (x_kg_sec < 0)
+
+    node_name_start = df["node_name_start"].to_numpy()
+    node_name_end = df["node_name_end"].to_numpy()
+    if "density_calc" in df:
+        density = df["density_calc"].to_numpy(dtype=float) * 1000
+    else:
+        density = df["res_liquid_density_kg_m3"].to_numpy(dtype=float)
+
+    x_kg_sec = np.where(start_is_source, x_kg_sec, np.abs(x_kg_sec))
+    velocity = df["velocity_m_sec"].to_numpy(dtype=float)
+    return {
+        "node_name_start": np.where(swap, node_name_end, node_name_start),
+        "node_name_end": np.where(swap, node_name_start, node_name_end),
+        "X_kg_sec": x_kg_sec,
+        "X_m3_day": x_kg_sec * 86400 / density,
+        "velocity_m_sec": np.where(start_is_source, velocity, np.abs(velocity)),
+    }
+
+
 def beautify_result_df(df):
     """
-    formats results table to be plotted
+    formats results table to be plotted, see `beautify_result_columns`
     
     Arguments:
-    df: pd.DataFrame - results table
+    df: pd.DataFrame - results table, changed inplace
     
     Returns:
     pd.DataFrame - formatted results table
     """
-    def swap_start_end(row):
-        if not row["startIsSource"] and row["X_kg_sec"] < 0:
-            return row["node_name_end"], row["node_name_start"]
-        else:
-            return row["node_name_start"], row["node_name_end"]
-
-    def make_positive(row, colname):
-        return row[colname] if row["startIsSource"] else abs(row[colname])
-
-    def make_flow_positive(row):
-        return make_positive(row, "X_kg_sec")
-
-    def make_velocity_positive(row):
-        return make_positive(row, "velocity_m_sec")
-
-    def convert_flow_to_m3_day(row):
-        density = (
-            row["density_calc"] * 1000
-            if "density_calc" in row
-            else row["res_liquid_density_kg_m3"]
-        )
-        return row["X_kg_sec"] * 86400 / density
-
-    df[["node_name_start", "node_name_end"]] = df.apply(
-        swap_start_end, axis=1, result_type="expand"
-    )
-    df["X_kg_sec"] = df.apply(make_flow_positive, axis=1)
-    df["X_m3_day"] = df.apply(convert_flow_to_m3_day, axis=1)
-    df["velocity_m_sec"] = df.apply(make_velocity_positive, axis=1)
+    for column, values in beautify_result_columns(df).items():
+        df[column] = values
     return(df)
 
 
@@ -172,52 +206,132 @@ def output_results(df):
 def clean(df):
     """
     filters out "oilwell"-type sections where pump model is unknown or is "Воронка"
+    and sections without start or end node
+    """
+    is_well = (df["juncType"] == "oilwell").to_numpy()
+    model = df["model"]
+    has_pump = (model.notna() & (model != "Воронка")).to_numpy()
+    has_nodes = (df["node_id_start"].notna() & df["node_id_end"].notna()).to_numpy()
+
+    filter_mask = (~is_well | has_pump) & has_nodes
+    return df[filter_mask].drop_duplicates()
+
+
+
+def check_schema(df, schema):
     """
-    only_pipes_mask = df["juncType"] != "oilwell"
-    wells_with_pump_mask = (
-        (df["juncType"] == "oilwell")
-        & (df["model"].notna())
-        & (df["model"] != "Воронка")
-    )
+    raises KeyError if df misses columns of schema
+    """
+    missed = [column for column in schema if column not in df.columns]
+    if missed:
+        raise KeyError(f"Input data misses columns: {missed}")
 
-    filter_mask = only_pipes_mask | wells_with_pump_mask
-    df = df[filter_mask]
-    df.dropna(subset=["node_id_start", "node_id_end"], how="any", inplace=True)
-    return df.drop_duplicates()
 
+def outlet_end_values(df, outlets_dict):
+    """
+    `endValue` of df with pressures of outlets_dict set on the rows ending at these outlets
+    """
+    outlets = {key: float(value) for key, value in outlets_dict.items()}
+    is_outlet = df["node_name_end"].isin(outlets.keys())
+    outlet_values = df["node_name_end"].map(outlets)
+    if "endValue" in df.columns:
+        return(df["endValue"].mask(is_outlet, outlet_values))
+    return(outlet_values)
 
 
 def fill(df, options):
     """
-    fills df for calculation with values needed
+    fills df for calculation with values needed,
+    input columns are checked and coerced once against FILL_SCHEMA,
+    all new and changed columns are set in one assign
     """
-    df = df.copy()
-    
+    check_schema(df, FILL_SCHEMA)
+    columns = {}
+
     for key, (value, _) in options["liquid_properties"].items():
-        df[key] = float(value)
+        columns[key] = float(value)
+
+    if options["outlets_dict"]:
+        columns["endValue"] = outlet_end_values(df, options["outlets_dict"])
+
+    columns["rs_schema_name"] = options["selected_dns"]
+    columns["effectiveD"] = options["eff_diam"]
+
+    productivity = df["productivity"]
+    columns["productivity"] = productivity.abs().mask(productivity == 0, 0.01).fillna(0.01)
+
+    end_is_outlet = df["endIsOutlet"]
+    columns["endIsOutlet"] = end_is_outlet.where(end_is_outlet.notna(), False)
+
+    for column, dtype in FILL_SCHEMA.items():
+        if dtype is not None:
+            columns[column] = columns.get(column, df[column]).astype(dtype)
+
+    df = df.assign(**columns)
+    df.columns = [FILL_RENAME.get(column, column) for column in df.columns]
+    return df
+
+
+
+def run_hcalc(df, options, data_folder):
+    """
+    cleans, fills and solves input data without cache
+
+    Returns:
+    pd.DataFrame - calculation results
+    HE2 graph - solved graph
+    """
+    dfClean = clean(df.copy())
+    dfFilled = fill(dfClean, options=options)
+    return(calculate_DF(dfFilled,
+                        data_folder,
+                        return_graph=True,
+                        solver_params=dict(SOLVER_PARAMS)))
 
-    for key, value in options["outlets_dict"].items():
-        df.loc[df["node_name_end"] == key, "endValue"] = float(value)
 
-    df["rs_schema_name"] = options["selected_dns"]
-    df["effectiveD"] = options["eff_diam"]
-    df["productivity"] = (
-        df["productivity"].apply(lambda x: abs(x) if x != 0 else 0.01).fillna(0.01)
-    )
+def validate_solution(g):
+    """
+    checks solved graph as the optimizer does: no negative pressures and misdirected flows
 
-    df["VolumeWater"] = df["VolumeWater"].astype(float)
-    df["endIsOutlet"] = df["endIsOutlet"].fillna(False)
-    df[["node_id_start", "node_id_end"]] = df[["node_id_start", "node_id_end"]].astype(
-        str
-    )
+    Returns:
+    bool - solution is valid
+    str - check_solution report
+    """
+    vld = check_solution(g)
+    valid = not ((vld.negative_P > 0) or (vld.misdirected_flow > 0) or (vld.bad_directions > 0))
+    return(valid, str(vld))
 
-    return df.rename(
-        columns={"__pad_num": "padNum", "__well_num": "wellNum", "d": "D", "s": "S"}
-    )
 
+def get_hcalc_cache():
+    """
+    returns process-wide cache of hydraulic calculation results,
+    built from `hcalc_cache` config section (max_mb, spill_dir for parquet copies, ttl) on first call
+    """
+    global _hcalc_cache
+    if _hcalc_cache is None:
+        with _hcalc_cache_lock:
+            if _hcalc_cache is None:
+                cache_conf = config.get_conf().get("hcalc_cache") or {}
+                _hcalc_cache = DataFrameCache(
+                    max_bytes=int(cache_conf.get("max_mb", DEFAULT_HCALC_CACHE_MAX_MB) * 1024 * 1024),
+                    spill_dir=cache_conf.get("spill_dir"),
+                )
+    return(_hcalc_cache)
+
+
+def hcalc_cache_key(df, options, data_folder):
+    """
+    returns content hash of input data and calculation options,
+    None if input data can't be hashed
+    """
+    try:
+        return(frame_digest(df, options, data_folder, SOLVER_PARAMS))
+    except TypeError as err:
+        logger.warning(f"Hydraulic calculation input is not hashable, cache is not used: {err}")
+        return(None)
 
 
-def get_hcalc_results(df, state, data_folder):
+def get_hcalc_results(df, state, data_folder, use_cache=True):
     """
     performs hydraulic calculation 
     
@@ -225,21 +339,22 @@ def get_hcalc_results(df, state, data_folder):
     df: pd.DataFrame - input data
     options: dict - input data
     data_folder: str - location to supplementary data for solver: inclination data, pumps table, etc.
+    use_cache: bool - return stored result for the same df and state["options"] (see `get_hcalc_cache`)
     
     Returns:
     pd.DataFrame
     """
-    ## Concat added pads
-    dfCalc = df.copy()
-    pass
-    
-    ## table calculation
-    dfClean = clean(dfCalc)
-    dfFilled = fill(dfClean, options=state["options"])
-    dfResult, g = calculate_DF(dfFilled,
-                               data_folder,
-                               return_graph=True,
-                               solver_params=dict(threshold=4.5))
+    key = hcalc_cache_key(df, state["options"], data_folder) if use_cache else None
+    if key is not None:
+        dfResult = get_hcalc_cache().get(key)
+        if dfResult is not None:
+            logger.debug(f"Hydraulic calculation result {key} is taken from cache")
+            return(dfResult)
+
+    dfResult, g = run_hcalc(df, state["options"], data_folder)
+    if key is not None:
+        ttl = (config.get_conf().get("hcalc_cache") or {}).get("ttl")
+        get_hcalc_cache().put(key, dfResult, ttl=ttl)
     return(dfResult)
 
 
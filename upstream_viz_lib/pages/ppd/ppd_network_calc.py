@@ -1,5 +1,11 @@
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
 import upstream_viz_lib.config as config
+import numpy as np
 import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
 from upstream_viz_lib.common.logger import logger
 
 # эти две функции из библиотеки солвера
@@ -10,6 +16,12 @@ from ksolver.tools.HE2_schema_maker import split_nodes_df_to_groups
 
 html_folder = config.get_conf()["data"]["html"]
 
+NODE_ID_COL = "node_id"
+EDGE_START_COL = "node_id_start"
+EDGE_END_COL = "node_id_end"
+MIN_BATCH_EDGES = 200
+LOOSE_LABEL = -1  # узлы и ребра вне компонент с ребрами
+
 
 # Это основная функция
 # принимает на вход ДФ узлов и ребер, получаемые из OTL-запросов
@@ -43,6 +55,113 @@ def app(df_edges, df_nodes, eff_diam=0.46, use_coord=False, coordinate_scaling=6
         return 0
 
 
+# Расчет по компонентам связности: независимые подсети (например, от разных КНС)
+# считаются отдельно в пуле процессов, время расчета определяется самой большой подсетью.
+# Мелкие подсети отправляются в пул пачками не меньше MIN_BATCH_EDGES ребер.
+# Возвращает результаты посчитанных подсетей и список непосчитанных (ДФ узлов подсети, текст ошибки):
+# сбой одной подсети не отменяет расчет остальных, вызывающий код должен показать непосчитанные
+def app_by_components(df_edges, df_nodes, eff_diam=0.46, max_workers=None):
+    df_edges = df_edges.assign(effectiveD=eff_diam)
+    df_inlets, df_outlets, df_jncs = split_nodes_df_to_groups(df_nodes)
+    inlets_dict = get_bounds_from_sidebar(df_inlets, "Граничные условия на КНС")
+    outlets_dict = get_bounds_from_sidebar(df_outlets, "Граничные условия на скважинах")
+    df_nodes_with_sidebar = get_proper_bound_df(df_nodes, inlets_dict, outlets_dict)
+
+    components = split_components(df_nodes_with_sidebar, df_edges)
+    batches = batch_components(components)
+    logger.debug(f"PPD network has {len(components)} components in {len(batches)} batches")
+    if len(batches) <= 1:
+        results = [result for batch in batches for result in solve_batch(batch)]
+    else:
+        max_workers = max_workers or (config.get_conf().get("pandarallel") or {}).get("n_cores")
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = [result for batch_results in executor.map(solve_batch, batches) for result in batch_results]
+
+    components = [component for batch in batches for component in batch]
+    solved = [result for result, error in results if error is None]
+    failed = [(component[0], error) for component, (_, error) in zip(components, results) if error is not None]
+    if failed:
+        logger.error(f"PPD components are not solved: {len(failed)} of {len(components)}")
+    if not solved:
+        return df_nodes_with_sidebar.iloc[:0], df_edges.iloc[:0], [], failed
+    df_nodes_rez = pd.concat([result[0] for result in solved])
+    df_edges_rez = pd.concat([result[1] for result in solved])
+    graphs = [result[2] for result in solved]
+    return df_nodes_rez, df_edges_rez, graphs, failed
+
+
+def solve_component(component):
+    # (результат солвера, None) или (None, текст ошибки)
+    df_nodes, df_edges = component
+    try:
+        return calculate_PPD_from_nodes_edges_df(df_nodes, df_edges), None
+    except Exception as e:
+        logger.error(f"PPD component of {len(df_nodes)} nodes is not solved: {e}")
+        return None, str(e)
+
+
+def solve_batch(batch):
+    return [solve_component(component) for component in batch]
+
+
+def batch_components(components: list, min_batch_edges: int = None) -> list:
+    # компоненты отсортированы по убыванию размера: крупные идут по одной, мелкие собираются в пачки
+    min_batch_edges = min_batch_edges or MIN_BATCH_EDGES
+    batches, batch, batch_edges = [], [], 0
+    for component in components:
+        batch.append(component)
+        batch_edges += len(component[1])
+        if batch_edges >= min_batch_edges:
+            batches.append(batch)
+            batch, batch_edges = [], 0
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def component_labels(starts: np.ndarray, ends: np.ndarray, n_nodes: int) -> np.ndarray:
+    # номер компоненты связности для каждого узла 0..n_nodes-1
+    adjacency = coo_matrix((np.ones(len(starts), dtype=np.int8), (starts, ends)), shape=(n_nodes, n_nodes))
+    _, labels = connected_components(adjacency, directed=False)
+    return labels
+
+
+def split_components(df_nodes: pd.DataFrame, df_edges: pd.DataFrame) -> list:
+    # [(узлы, ребра)] компонент связности, крупные компоненты первыми.
+    # Узлы без ребер (и ребра без узлов на концах) сами по себе не считаются:
+    # они добавляются к самой большой компоненте, как если бы сеть считалась целиком
+    codes, uniques = pd.factorize(
+        pd.concat([df_nodes[NODE_ID_COL], df_edges[EDGE_START_COL], df_edges[EDGE_END_COL]], ignore_index=True)
+    )
+    n_nodes, n_edges = len(df_nodes), len(df_edges)
+    node_codes = codes[:n_nodes]
+    starts = codes[n_nodes:n_nodes + n_edges]
+    ends = codes[n_nodes + n_edges:]
+    linked = (starts >= 0) & (ends >= 0)
+    labels = np.append(component_labels(starts[linked], ends[linked], len(uniques)), LOOSE_LABEL)
+
+    edge_labels = labels[np.where(starts >= 0, starts, ends)]
+    node_labels = labels[node_codes]
+    node_labels[~np.isin(node_labels, edge_labels)] = LOOSE_LABEL
+
+    nodes_by_label = dict(iter(df_nodes.groupby(node_labels, sort=False)))
+    edges_by_label = dict(iter(df_edges.groupby(edge_labels, sort=False)))
+    loose = (nodes_by_label.pop(LOOSE_LABEL, df_nodes.iloc[:0]), edges_by_label.pop(LOOSE_LABEL, df_edges.iloc[:0]))
+    components = [
+        (nodes_by_label.get(label, df_nodes.iloc[:0]), edges_by_label[label])
+        for label in sorted(edges_by_label)
+    ]
+    components.sort(key=lambda component: len(component[1]), reverse=True)
+
+    if len(loose[0]) or len(loose[1]):
+        if components:
+            largest = components[0]
+            components[0] = (pd.concat([largest[0], loose[0]]), pd.concat([largest[1], loose[1]]))
+        else:
+            components = [loose]
+    return components
+
+
 def get_bounds_from_sidebar(df_bound: pd.DataFrame, form_name: str) -> dict:
     return_dict = {}
     for row in df_bound.sort_values("node_name").to_dict(orient="records"):
@@ -57,14 +176,86 @@ def get_single_bound(row: dict) -> dict:
     return {name: {"kind": kind, "value": value}}
 
 
+def map_by_node_name(df_nodes: pd.DataFrame, column: str, mapping: dict) -> pd.Series:
+    # значения из mapping для узлов, перечисленных в нем, остальные узлы сохраняют свои значения
+    names = df_nodes["node_name"]
+    mapped = names.map(mapping)
+    if column not in df_nodes.columns:
+        return mapped
+    return df_nodes[column].mask(names.isin(mapping.keys()), mapped)
+
+
 def get_proper_bound_df(df_nodes, inlets_dict, outlets_dict):
-    df_nodes_with_sidebar = df_nodes.copy()
-    for name, bound in {**inlets_dict, **outlets_dict}.items():
+    bounds = {**inlets_dict, **outlets_dict}
+    kinds = {name: bound["kind"] for name, bound in bounds.items()}
+    values = {}
+    for name, bound in bounds.items():
         try:
-            kind, value = bound["kind"], bound["value"]
-            mask = df_nodes_with_sidebar["node_name"] == name
-            df_nodes_with_sidebar.loc[mask, "kind"] = kind
-            df_nodes_with_sidebar.loc[mask, "value"] = float(value)
-        except ValueError as err:
-            logger(err)
-    return df_nodes_with_sidebar
+            values[name] = float(bound["value"])
+        except (TypeError, ValueError) as err:
+            logger.warning(f"Bound value of {name} is not a number: {err}")
+    return df_nodes.assign(
+        kind=map_by_node_name(df_nodes, "kind", kinds),
+        value=map_by_node_name(df_nodes, "value", values),
+    )
+
+
+def bounds_key(bounds: dict) -> tuple:
+    return tuple(sorted((name, bound["kind"], str(bound["value"])) for name, bound in bounds.items()))
+
+
+class PPDResultCache:
+    """
+    Кэш результатов расчета сети ППД по наборам граничных условий (what-if) на одной сети.
+
+    Ребра с эффективным диаметром и группы узлов готовятся один раз. Если такой набор ГУ уже считался
+    (хранятся `max_results` последних), результат возвращается без запуска солвера.
+    Любой новый набор ГУ считается солвером полностью, с нуля.
+    Отличия ГУ от предыдущего вызова доступны в `last_changed`.
+    Результаты общие для повторных вызовов, изменять их нельзя.
+    """
+
+    def __init__(self, df_edges, df_nodes, eff_diam=0.46, max_results=16):
+        self.df_edges = df_edges.assign(effectiveD=eff_diam)
+        self.df_nodes = df_nodes
+        self.df_inlets, self.df_outlets, self.df_jncs = split_nodes_df_to_groups(df_nodes)
+        self.max_results = max_results
+        self.last_bounds = {}
+        self.last_changed = {}
+        self.stats = {"solved": 0, "reused": 0}
+        self._results = OrderedDict()
+
+    def default_bounds(self):
+        return (
+            get_bounds_from_sidebar(self.df_inlets, "Граничные условия на КНС"),
+            get_bounds_from_sidebar(self.df_outlets, "Граничные условия на скважинах"),
+        )
+
+    def changed_bounds(self, bounds: dict) -> dict:
+        # имя узла -> (предыдущее ГУ или None, новое ГУ)
+        return {
+            name: (self.last_bounds.get(name), bound)
+            for name, bound in bounds.items()
+            if self.last_bounds.get(name) != bound
+        }
+
+    def calculate(self, inlets_dict=None, outlets_dict=None):
+        default_inlets, default_outlets = self.default_bounds()
+        bounds = {**default_inlets, **default_outlets, **(inlets_dict or {}), **(outlets_dict or {})}
+        self.last_changed = self.changed_bounds(bounds)
+        self.last_bounds = bounds
+        key = bounds_key(bounds)
+
+        if key in self._results:
+            self._results.move_to_end(key)
+            self.stats["reused"] += 1
+            logger.debug(f"PPD calculation reused, changed bounds: {list(self.last_changed)}")
+            return self._results[key]
+
+        df_nodes_with_sidebar = get_proper_bound_df(self.df_nodes, bounds, {})
+        result = calculate_PPD_from_nodes_edges_df(df_nodes_with_sidebar, self.df_edges)
+        self.stats["solved"] += 1
+        self._results[key] = result
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+        return result
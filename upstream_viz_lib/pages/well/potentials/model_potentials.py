@@ -1,8 +1,10 @@
 import locale
+import numpy as np
 import pandas as pd
 from pandarallel import pandarallel
 from upstream_viz_lib.common import otp
 from upstream.potentials.Economics import Economics
+from upstream_viz_lib.common.economics import fcf_columns
 from upstream.potentials.Optimizer import get_lambda_thresholds, optimize
 from upstream_viz_lib.pages.well.potentials.static.command_format import *
 
@@ -50,7 +52,7 @@ def calculate_wells(df, criterions, params):
         axis=1,
     )
     df = df.join(result_df)
-    df_with_economics = df.apply(lambda x: calculate_fcf(x, params), axis=1)
+    df_with_economics = calculate_fcf_columns(df, params)
     df = df.join(df_with_economics)
     df = get_diff_columns(df)
     return df
@@ -92,7 +94,7 @@ def value_with_locale(value):
 
 def calculate_fcf(row, params):
     """
-    _INSIDE_ calculate_wells
+    one well, see calculate_fcf_columns
     :param row:
     :param params:
     :return: IS NOT responsible for drawing!
@@ -148,6 +150,48 @@ def calculate_fcf(row, params):
     return pd.Series(result_dict)
 
 
+def calculate_fcf_columns(df, params):
+    """
+    _INSIDE_ calculate_wells
+    same values as calculate_fcf for every row of df
+    :param df:
+    :param params:
+    :return: dataframe of current, frequency-optimal and ESP FCF with df index. IS NOT responsible for drawing!
+    """
+    q = df["Q"].to_numpy(dtype=float)
+    q_n_current = df["oilWellopCountedOilDebit"].to_numpy(dtype=float)
+    ro_sm = df["FluidDensity"].to_numpy(dtype=float) / 1000
+    ure = df["ure"].to_numpy(dtype=float)
+    q_freq_optimal = df["Q_freq_optimal"].to_numpy(dtype=float)
+    q_technical_limit = df["potential_oil_rate_technical_limit"].to_numpy(dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        q_n_freq_optimal = q_n_current * (q_freq_optimal / q)
+
+        esp_found = (df["Рекомендуемый УЭЦН"] != "Не удалось подобрать УЭЦН").to_numpy()
+        q_esp = np.where(esp_found, q_technical_limit, q)
+        q_n = q_n_current * (q_esp / q)
+        ure_esp = 24 * df["power_esp_optimal"].to_numpy(dtype=float) / q_technical_limit
+
+    # current, frequency-optimal and ESP variants of every well in one pass over the columns
+    returns = fcf_columns(
+        q_zh_vol=np.concatenate([q, q_freq_optimal, q_esp]),
+        ro_sm=np.tile(ro_sm, 3),
+        q_n=np.concatenate([q_n_current, q_n_freq_optimal, q_n]),
+        specific_energy_mp=np.concatenate([ure, ure, ure_esp]),  # В процентах от 0 до 1
+        params=params,
+    ).reshape(3, -1)
+    result_dict = {
+        "Q_n_freq_optimal": q_n_freq_optimal,
+        "Q_n_new_esp": q_n,
+        "ure_new_esp": ure_esp,
+        "FCF текущий": returns[0],
+        "FCF оптимальный": returns[1],
+        "FCF насос": returns[2],
+    }
+    return pd.DataFrame(result_dict, index=df.index)
+
+
 def calculation_event(df):
     # st.write(df)
     df[["event", "q_event", "q_n_event", "FCF_event"]] = df.apply(
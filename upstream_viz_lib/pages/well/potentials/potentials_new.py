@@ -14,11 +14,8 @@ def get_data_from_platform(water_limit, date) -> Optional[pd.DataFrame]:
     :param date:
     :return: dataframe filtered by water_limit
     """
-    query = otp.render_query(QUERY_POTENTIALS, {"$date$": date})
+    query = otp.render_query(QUERY_POTENTIALS, {"$date$": date, "$water_limit$": float(water_limit)})
     data_from_platform = otp.get_data(query)
-
-    if not data_from_platform.empty:
-        data_from_platform = data_from_platform.query(f"water <= {water_limit}")
     return data_from_platform
 
 
@@ -165,6 +165,7 @@ QUERY_POTENTIALS = """
 | where day="$date$"
 | where state="const"
 | where potential_oil_rate_technical_limit > Q
+| where water <= $water_limit$
 """
 SUM_DEBIT = """
  | readFile format=parquet path=FS/mechfond/totals
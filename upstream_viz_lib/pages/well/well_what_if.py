@@ -3,6 +3,7 @@ import pandas as pd
 from os import path
 from typing import Tuple, Union
 from upstream_viz_lib.common import otp
+from upstream_viz_lib.common.query_template import compile_template
 from upstream_viz_lib.config import get_data_folder
 import numpy as np
 
@@ -18,6 +19,12 @@ QUERY_WELL_DAILY_PARAMS = f"""
 | latestrow _time=day engine=window by __deposit, __well_num
 """
 
+QUERY_SINGLE_WELL_DAILY_PARAMS = """
+| __SOURCE__
+| where __well_num="__WELL_NUM__"
+| latestrow _time=day engine=window by __deposit, __well_num
+"""
+
 def get_pump_curves_and_pump_model_list() -> Tuple[pd.DataFrame, list]:
     """
     _INSIDE_ app
@@ -33,12 +40,10 @@ def get_what_if_data(well_num: str) -> pd.DataFrame:
     """
     _INSIDE_ app
     """
-    query = otp.render_query(
-        QUERY_WELL_DAILY_PARAMS,
-        {"__SOURCE__": config.get_conf("get_data.yaml")["well"]["whatif"]},
-    )
+    query = compile_template(
+        QUERY_SINGLE_WELL_DAILY_PARAMS, raw=("SOURCE",)
+    ).render({"SOURCE": config.get_conf("get_data.yaml")["well"]["whatif"], "WELL_NUM": well_num})
     df_well_params = otp.get_data(query)
-    df_well_params = df_well_params[df_well_params["__well_num"] == well_num]
     return df_well_params
 
 